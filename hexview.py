@@ -1,4 +1,10 @@
+import csv
+import os
+import re
+import threading
 import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 
 import numpy as np
 
@@ -13,6 +19,10 @@ logger.setLevel(logging.DEBUG)
 draw_log = logging.getLogger("draw")
 scroll_log = logging.getLogger("scroll")
 
+# text of every byte value, so hex formatting is a lookup instead of a
+# string operation per byte
+hex_byte_text = ["%02x" % i for i in range(256)]
+
 
 def ForceBetween(min, val, max):
     if val  > max:
@@ -31,13 +41,86 @@ class Scroller:
 
     def SetScrollbars(self, fw, fh, w, h, x, y):
         if (self.ow != w or self.oh != h or self.ox != x or self.oy != y):
-            scroll_log.debug("Setting scrollbar to: %s" % str([fw, fh, w, h, x, y]))
+            scroll_log.debug("Setting scrollbar to: %s", [fw, fh, w, h, x, y])
             self.parent.SetScrollbars(fw, fh, w, h, x, y)
             self.ow = w
             self.oh = h
             self.ox = x
             self.oy = y
 
+class AutoScroller(object):
+    """Scrolls a view while a drag selection is outside the viewport.
+
+    A frame timer moves the view at a speed that grows with the pointer's
+    distance beyond the edge of the window, so hovering just outside the
+    edge creeps a row at a time while pulling far away covers megabytes
+    in seconds. Fractional rows and cells are accumulated between frames,
+    and each frame that crosses a row or cell boundary scrolls the view
+    once, so only the newly exposed rows and the change in selection get
+    repainted.
+    """
+    frame_interval = 16  # milliseconds
+    base_speed = 8.0  # rows or cells per second just outside the edge
+    max_speed = 20000.0
+
+    def __init__(self, view_obj):
+        self.view_obj = view_obj
+        self.pointer = (0, 0)
+        self.velocity = (0.0, 0.0)
+        self.remainder = [0.0, 0.0]
+        self.last_frame_time = 0
+        self.timer = wx.Timer(view_obj)
+        view_obj.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+
+    @property
+    def is_running(self):
+        return self.timer.IsRunning()
+
+    def calc_speed(self, distance, cell_size):
+        # quadratic in the distance (measured in cells) for fine control
+        # near the edge and fast travel further away
+        if distance == 0:
+            return 0.0
+        cells = abs(distance) / float(cell_size)
+        speed = min(self.base_speed * (1.0 + cells) ** 2, self.max_speed)
+        return speed if distance > 0 else -speed
+
+    def update(self, x, y):
+        """Set the scroll velocity from the pointer position (in client
+        coordinates), starting or stopping the timer as necessary.
+        """
+        v = self.view_obj
+        w, h = v.GetClientSize()
+        self.pointer = (x, y)
+        dx = x if x < 0 else max(0, x - w)
+        dy = y if y < 0 else max(0, y - h)
+        self.velocity = (self.calc_speed(dx, v.cell_width_in_pixels), self.calc_speed(dy, v.cell_height_in_pixels))
+        if self.velocity == (0.0, 0.0):
+            self.stop()
+        elif not self.is_running:
+            self.remainder = [0.0, 0.0]
+            self.last_frame_time = time.time()
+            self.timer.Start(self.frame_interval)
+
+    def stop(self):
+        self.timer.Stop()
+        self.velocity = (0.0, 0.0)
+
+    def on_timer(self, event):
+        now = time.time()
+        # a stalled event loop shouldn't produce a huge jump
+        dt = min(now - self.last_frame_time, 0.1)
+        self.last_frame_time = now
+        steps = []
+        for i in range(2):
+            self.remainder[i] += self.velocity[i] * dt
+            step = int(self.remainder[i])
+            self.remainder[i] -= step
+            steps.append(step)
+        if steps[0] or steps[1]:
+            self.view_obj.autoscroll_by(steps[0], steps[1], *self.pointer)
+
+
 class FakeList(object):
     def __init__(self, count):
         self.num_items = count
@@ -55,21 +138,120 @@ class FakeList(object):
             return "slice"
 
 
+class BitmapCache(object):
+    """Size-bounded LRU cache of rendered bitmaps.
+
+    Entries are partitioned by zoom level (the key of the view's
+    ZoomLevel) so a zoom change only has to throw away the partitions that are no
+    longer in use. The most recently used `max_zoom_levels` partitions are
+    kept so zooming back and forth doesn't refill the cache each time.
+    """
+    bytes_per_pixel = 4
+
+    def __init__(self, max_bytes, max_zoom_levels=2):
+        self.max_bytes = max_bytes
+        self.max_zoom_levels = max_zoom_levels
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        self.partitions = OrderedDict()
+        self.current = None
+        self.current_zoom = None
+        self.num_bytes = 0
+        self.sizes = {}
+
+    def __len__(self):
+        return sum([len(p) for p in self.partitions.values()])
+
+    def select_zoom(self, zoom):
+        if zoom == self.current_zoom:
+            return
+        try:
+            self.current = self.partitions.pop(zoom)
+        except KeyError:
+            self.current = OrderedDict()
+        self.partitions[zoom] = self.current
+        self.current_zoom = zoom
+        while len(self.partitions) > self.max_zoom_levels:
+            _, stale = self.partitions.popitem(last=False)
+            self.evict_partition(stale)
+
+    def evict_partition(self, partition):
+        for k in partition:
+            self.num_bytes -= self.sizes.pop(k)
+        self.evictions += len(partition)
+
+    def __getitem__(self, k):
+        try:
+            bmp = self.current[k]
+        except (KeyError, TypeError):
+            self.misses += 1
+            raise KeyError(k)
+        self.current.move_to_end(k)
+        self.hits += 1
+        return bmp
+
+    def __setitem__(self, k, bmp):
+        if self.current is None:
+            self.select_zoom(None)
+        _, _, width, height = k
+        size = width * height * self.bytes_per_pixel
+        if k in self.sizes:
+            self.num_bytes -= self.sizes[k]
+        self.current[k] = bmp
+        self.sizes[k] = size
+        self.num_bytes += size
+        self.enforce_budget()
+
+    def enforce_budget(self):
+        # stale zoom levels go first, then least recently used entries of
+        # the current level, but never the entry that was just added
+        for partition in list(self.partitions.values()):
+            while self.num_bytes > self.max_bytes and len(partition) > 1:
+                k, _ = partition.popitem(last=False)
+                self.num_bytes -= self.sizes.pop(k)
+                self.evictions += 1
+            if self.num_bytes <= self.max_bytes:
+                break
+
+    def get_stats(self):
+        return {
+            "entries": len(self),
+            "bytes": self.num_bytes,
+            "max_bytes": self.max_bytes,
+            "zoom_levels": len(self.partitions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
 class DrawTextImageCache(object):
     def __init__(self, machine, view_obj, font=None):
+        if font is None:
+            font = view_obj.font
         self.font = font
         self.view_obj = view_obj
-        self.cache = {}
+        self.cache = BitmapCache(machine.bitmap_cache_bytes)
         self.set_colors(machine)
 
+    def set_font(self, font):
+        # cached bitmaps are partitioned by zoom level, so there's nothing
+        # to throw away when the font changes along with the zoom level
+        self.font = font
+
     def invalidate(self):
-        self.cache = {}
+        self.cache.clear()
+
+    def select_zoom(self):
+        self.cache.select_zoom(self.view_obj.zoom_level.key)
 
     def set_colors(self, m):
         self.color = m.text_color
         self.diff_color = m.diff_text_color
-        if self.font is None:
-            self.font = m.text_font
         self.selected_background = m.highlight_color
         self.selected_brush = wx.Brush(m.highlight_color, wx.SOLID)
         self.selected_pen = wx.Pen(m.highlight_color, 1, wx.SOLID)
@@ -104,7 +286,7 @@ class DrawTextImageCache(object):
             self.cache[k] = bmp
         dc.DrawBitmap(bmp, rect.x, rect.y)
 
-    def draw_text_to_dc(self, dc, bg_rect, fg_rect, text, style):
+    def draw_text_to_dc(self, dc, bg_rect, fg_rect, text, style, font=None):
         if style & selected_bit_mask:
             dc.SetBrush(self.selected_brush)
             dc.SetPen(self.selected_pen)
@@ -135,18 +317,159 @@ class DrawTextImageCache(object):
             dc.SetTextForeground(self.diff_color)
         else:
             dc.SetTextForeground(self.color)
-        dc.SetFont(self.font)
+        dc.SetFont(self.font if font is None else font)
         dc.DrawText(text, fg_rect.x, fg_rect.y)
 
     def draw_text(self, dc, rect, text, style):
-        draw_log.debug(str((text, rect)))
+        self.select_zoom()
         for i, c in enumerate(text):
             s = style[i]
             self.draw_cached_text(dc, rect, c, s)
             rect.x += self.view_obj.cell_width_in_pixels
 
 
-class FakeStyle(object):
+class ZoomLevel(object):
+    def __init__(self, font, fw, fh, view_params):
+        self.font = font
+        self.point_size = font.GetPointSize()
+        self.fw = fw
+        self.fh = fh
+        self.cell_width_in_pixels = view_params.pixel_width_padding * 2 + view_params.base_cell_width_in_chars * fw
+        self.cell_height_in_pixels = fh + view_params.row_height_extra_padding
+        # fonts of different sizes can share cell metrics, so rendered
+        # glyphs are keyed by the font as well
+        self.key = (font.GetFaceName(), self.point_size, self.cell_width_in_pixels, self.cell_height_in_pixels)
+
+
+class ZoomLadder(object):
+    """The font sizes a view can zoom between.
+
+    The metrics of every size are measured once when the ladder is created,
+    so changing zoom is a lookup instead of a round trip through a DC; the
+    renderers can then prebuild their glyph sets for each level ahead of
+    time.
+    """
+    default_sizes = [7, 8, 9, 10, 11, 12, 14, 16, 18, 20]
+
+    def __init__(self, base_font, view_params, sizes=None):
+        if sizes is None:
+            sizes = self.default_sizes
+        base_size = base_font.GetPointSize()
+        self.sizes = sorted(set(sizes) | set([base_size]))
+        self.default_index = self.sizes.index(base_size)
+        bmp = wx.Bitmap(1, 1)
+        dc = wx.MemoryDC(bmp)
+        self.levels = []
+        for size in self.sizes:
+            font = wx.Font(base_font)
+            font.SetPointSize(size)
+            dc.SetFont(font)
+            self.levels.append(ZoomLevel(font, dc.GetCharWidth(), dc.GetCharHeight(), view_params))
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __getitem__(self, index):
+        return self.levels[index]
+
+
+class RenderStats(object):
+    """Structured per-frame instrumentation of a view's Draw.
+
+    Listeners (an on-screen HUD, a CSV writer, a profiler...) are attached
+    with add_listener and are called with a dict of statistics at the end
+    of every frame: rows and cells drawn, bitmap cache hits and misses,
+    time spent computing styles, composing glyph bitmaps and blitting, and
+    the number of display refreshes the frame overran.
+
+    With no listeners attached, `in_frame` is never set and the drawing
+    code skips all of the bookkeeping, so the cost is one attribute test
+    at each instrumented point.
+    """
+    frame_budget = 1.0 / 60
+    sections = ["style", "compose", "blit"]
+
+    def __init__(self):
+        self.listeners = []
+        self.in_frame = False
+        self.num_frames = 0
+
+    @property
+    def enabled(self):
+        return bool(self.listeners)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def begin_frame(self, caches):
+        self.caches = caches
+        self.cache_counts = [(c.hits, c.misses) for c in caches]
+        self.rows = 0
+        self.cells = 0
+        self.times = dict.fromkeys(self.sections, 0.0)
+        self.in_frame = True
+        self.start_time = time.perf_counter()
+
+    def add_drawn(self, num_rows, num_cells):
+        self.rows += num_rows
+        self.cells += num_rows * num_cells
+
+    def add_time(self, section, start_time):
+        self.times[section] += time.perf_counter() - start_time
+
+    def end_frame(self, full_redraw):
+        elapsed = time.perf_counter() - self.start_time
+        self.in_frame = False
+        self.num_frames += 1
+        hits = misses = 0
+        for cache, (h, m) in zip(self.caches, self.cache_counts):
+            hits += cache.hits - h
+            misses += cache.misses - m
+        stats = {
+            "frame": self.num_frames,
+            "time": time.time(),
+            "frame_ms": elapsed * 1000.0,
+            "full_redraw": full_redraw,
+            "rows": self.rows,
+            "cells": self.cells,
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "dropped_frames": int(elapsed // self.frame_budget),
+        }
+        accounted = 0.0
+        for section, seconds in self.times.items():
+            stats[section + "_ms"] = seconds * 1000.0
+            accounted += seconds
+        stats["other_ms"] = max(0.0, elapsed - accounted) * 1000.0
+        self.caches = None
+        for listener in list(self.listeners):
+            listener(stats)
+
+
+class RenderStatsCSVWriter(object):
+    """RenderStats listener that appends one line per frame to a CSV file"""
+    columns = ["frame", "time", "frame_ms", "full_redraw", "rows", "cells", "cache_hits", "cache_misses", "style_ms", "compose_ms", "blit_ms", "other_ms", "dropped_frames"]
+
+    def __init__(self, fh):
+        self.writer = csv.DictWriter(fh, self.columns, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def __call__(self, stats):
+        self.writer.writerow(stats)
+
+
+class StyleEngine(object):
+    """Computes the uint8 style array for any slice of the table's data.
+
+    The selection is applied with range math (including any additional
+    selected ranges, which are only queried for the requested slice), and
+    each style layer of the table (see HexTable.set_style_layer) is OR'd in
+    using its bit mask, so the style for a whole viewport is a handful of
+    vectorized operations.
+    """
     def __init__(self, view_obj):
         self.view_obj = view_obj
 
@@ -154,34 +477,60 @@ class FakeStyle(object):
         return len(self.view_obj.table.data)
 
     def __getitem__(self, item):
-        index, last_index = item.start, item.stop
         try:
             index, last_index = item.start, item.stop
-        except:
+        except AttributeError:
             index, last_index = item, item + 1
+        stats = self.view_obj.render_stats
+        if stats.in_frame:
+            start_time = time.perf_counter()
         count = last_index - index
         style = np.zeros(count, dtype=np.uint8)
-        if last_index < self.view_obj.SelectBegin or index >= self.view_obj.SelectEnd:
-            pass
-        else:
-            for i in range(index, last_index):
-                if i >= self.view_obj.SelectBegin and i < self.view_obj.SelectEnd:
-                    style[i - index] = selected_bit_mask
+        self.add_selection(style, index, last_index)
+        for mask, layer in self.view_obj.table.style_layers.items():
+            bits = layer[index:last_index]
+            style[0:len(bits)] |= bits & mask
+        if stats.in_frame:
+            stats.add_time("style", start_time)
         return style
 
+    def add_selection(self, style, index, last_index):
+        v = self.view_obj
+        for ranges in (v.selected_ranges, v.block_ranges):
+            if ranges is not None and len(ranges):
+                style |= ranges[index:last_index] & selected_bit_mask
+        if v.block_ranges is not None or v.SelectBegin is None or v.SelectEnd is None:
+            # a block selection replaces the linear range between its corners
+            return
+        start = max(v.SelectBegin, index) - index
+        end = min(v.SelectEnd, last_index) - index
+        if end > start:
+            style[start:end] |= selected_bit_mask
+
 
 class FixedFontDataWindow(wx.ScrolledWindow):
+    # IntervalIndex objects holding index ranges selected in addition to
+    # SelectBegin/SelectEnd; only used by views of numpy data
+    selected_ranges = None
+    block_ranges = None
+
+    # only views that compose rows from the glyph atlas want the table's
+    # hex renderer to be a HexByteGlyphAtlas
+    uses_glyph_atlas = False
+
     def __init__(self, parent, settings_obj, table, view_params):
 
         wx.ScrolledWindow.__init__(self, parent, -1, style=wx.WANTS_CHARS)
 
         self.isDrawing = False
         self.settings_obj = settings_obj
+        self.render_stats = RenderStats()
+        self.zoom_index = None
         self.MapEvents()
         self.InitDoubleBuffering()
         self.InitScrolling(parent)
+        self.style = StyleEngine(self)
         self.recalc_view(view_params, table)
-        self.style = FakeStyle(self)
 
     def recalc_view(self, view_params=None, table=None):
         if view_params is not None:
@@ -196,6 +545,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
     def set_table(self, table):
         self.InitCoords()
         self.table = table
+        self.invalidate_all()
         self.cx = self.table.enforce_valid_cursor(self.cy, self.cx)
         self.AdjustScrollbars()
         self.init_renderers()
@@ -215,6 +565,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
         self.cy = 0
         self.sx = 0
         self.sy = 0
+        self.pixel_offset_y = 0  # sub-row scroll offset used by smooth scrolling
         self.sw = 0
         self.sh = 0
 
@@ -261,7 +612,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             dc = wx.ClientDC(self)
         if dc.IsOk():
             self.SetCharDimensions()
-            scroll_log.debug(str(("scroll:", self.sx, self.sy, "cursor", self.cx, self.cy)))
+            scroll_log.debug("scroll: %d %d cursor %d %d", self.sx, self.sy, self.cx, self.cy)
             if self.Selecting:
                 self.KeepCaretOnScreen()
             else:
@@ -270,6 +621,12 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             self.Draw(dc)
             self.parent_scrolled_window.update_dependents()
 
+    def schedule_update(self, reason):
+        """Request a repaint that may be coalesced with others by the
+        parent's scroll sync.
+        """
+        self.parent_scrolled_window.schedule_paint(reason)
+
     def OnPaint(self, event):
         dc = wx.PaintDC(self)
         if self.isDrawing:
@@ -285,15 +642,93 @@ class FixedFontDataWindow(wx.ScrolledWindow):
 ##-------------------- Drawing code
 
     def InitFonts(self):
-        dc = wx.ClientDC(self)
-        dc.SetFont(self.settings_obj.text_font)
-        self.fw = dc.GetCharWidth()
-        self.fh = dc.GetCharHeight()
-        self.cell_width_in_pixels = self.view_params.pixel_width_padding * 2 + self.view_params.base_cell_width_in_chars * self.fw
-        self.cell_height_in_pixels = self.fh + self.view_params.row_height_extra_padding
+        s = self.settings_obj
+        self.zoom_ladder = ZoomLadder(s.text_font, self.view_params, s.zoom_font_sizes)
+        if self.zoom_index is None:
+            self.zoom_index = self.zoom_ladder.default_index
+        self.zoom_index = ForceBetween(0, self.zoom_index, len(self.zoom_ladder) - 1)
+        self.set_font_metrics(self.zoom_ladder[self.zoom_index])
+
+    def set_font_metrics(self, level):
+        self.zoom_level = level
+        self.font = level.font
+        self.fw = level.fw
+        self.fh = level.fh
+        self.cell_width_in_pixels = level.cell_width_in_pixels
+        self.cell_height_in_pixels = level.cell_height_in_pixels
 
     def InitDoubleBuffering(self):
-        pass
+        # Drawing goes into a persistent backing store so that only the rows
+        # that have changed since the last frame need to be repainted.
+        self.backing_store = None
+        self.scroll_buffer = None
+        self.dirty_rows = set()
+        self.exposed_cells = None
+        self.full_redraw = True
+        self.drawn_view_state = None
+        self.drawn_caret = None
+        self.drawn_selection = (None, None)
+
+    @property
+    def num_drawn_rows(self):
+        # one row more than fits in the window, so the partially visible
+        # row is available when scrolled by a fraction of a row
+        return self.sh + 2
+
+##-------- Dirty region tracking
+
+    def invalidate_all(self):
+        self.full_redraw = True
+
+    def invalidate_rows(self, first_row, last_row):
+        """Mark rows first_row through last_row (inclusive) for repainting;
+        anything outside the viewport is ignored.
+        """
+        first_row = max(first_row, self.sy)
+        last_row = min(last_row, self.sy + self.num_drawn_rows - 1)
+        if last_row >= first_row:
+            self.dirty_rows.update(range(first_row, last_row + 1))
+
+    def invalidate_index_range(self, index, last_index):
+        """Mark the rows containing data from index up to (but not
+        including) last_index for repainting; used after data edits.
+        """
+        self.invalidate_all()
+
+    def invalidate_selection(self, old_selection, new_selection):
+        self.invalidate_all()
+
+    def invalidate_caret(self, old_caret, new_caret):
+        # the caret outline extends a few pixels into the neighboring rows
+        for caret in (old_caret, new_caret):
+            if caret is not None:
+                self.invalidate_rows(caret[1] - 1, caret[1] + 1)
+
+    def get_view_state(self):
+        return (self.sx, self.sy, self.sw, self.sh, self.cell_width_in_pixels, self.cell_height_in_pixels)
+
+    def prepare_backing_store(self):
+        w, h = self.GetClientSize()
+        w, h = max(w, 1), max(h, 1) + self.cell_height_in_pixels
+        if self.backing_store is None or self.backing_store.GetSize() != (w, h):
+            self.backing_store = wx.Bitmap(w, h)
+            self.full_redraw = True
+        state = self.get_view_state()
+        if state != self.drawn_view_state:
+            if self.full_redraw or self.drawn_view_state is None or state[2:] != self.drawn_view_state[2:]:
+                self.full_redraw = True
+            else:
+                sx, sy = self.drawn_view_state[0:2]
+                self.scroll_backing_store(self.sx - sx, self.sy - sy)
+            self.drawn_view_state = state
+        caret = (self.cx, self.cy)
+        if caret != self.drawn_caret:
+            self.invalidate_caret(self.drawn_caret, caret)
+            self.drawn_caret = caret
+        selection = (self.SelectBegin, self.SelectEnd)
+        if selection != self.drawn_selection:
+            self.invalidate_selection(self.drawn_selection, selection)
+            self.drawn_selection = selection
 
 ##-------- Enforcing screen boundaries, cursor movement
 
@@ -312,6 +747,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
         self.sy = ForceBetween(0, self.sy, max(self.sh, self.table.num_rows - self.sh + 1))
 
     def cVert(self, num):
+        self.pixel_offset_y = 0
         self.cy = self.cy + num
         self.cy = ForceBetween(0, self.cy, self.table.num_rows - 1)
         self.sy = ForceBetween(self.cy - self.sh + 1, self.sy, self.cy)
@@ -348,82 +784,45 @@ class FixedFontDataWindow(wx.ScrolledWindow):
         # redraw the screen manually every time
         self.parent_scrolled_window = parent
         self.EnableScrolling(False, False)
-        self.nextScrollTime = 0
-        self.scrollTimer = wx.Timer(self)
         self.scroller = Scroller(self)
+        self.autoscroller = AutoScroller(self)
 
     def SetScrollManager(self, parent):
         self.scroller = Scroller(parent)
         self.AdjustScrollbars()
 
-    def CanScroll(self):
-       if time.time() >  self.nextScrollTime:
-           self.nextScrollTime = time.time() + (self.settings_obj.scroll_delay / 1000.0)
-           return True
-       else:
-           return False
-
-    def SetScrollTimer(self):
-        oneShot = True
-        self.scrollTimer.Start(self.settings_obj.scroll_delay/2, oneShot)
-        self.Bind(wx.EVT_TIMER, self.OnTimer)
-
-    def OnTimer(self, event):
-        screenX, screenY = wx.GetMousePosition()
-        x, y = self.ScreenToClient((screenX, screenY))
-        self.MouseToRow(y)
-        self.MouseToCol(x)
+    def autoscroll_by(self, num_cells, num_rows, mouseX, mouseY):
+        """Scroll the view during a drag selection and extend the selection
+        to the pointer, which is pinned to the edge of the new viewport.
+        """
+        sx, sy = self.sx, self.sy
+        # unlike HorizBoundaries/VertBoundaries, never scroll past the end
+        # of the data, even when it doesn't fill the window
+        self.SetCharDimensions()
+        t = self.table
+        self.sx = ForceBetween(0, sx + num_cells, max(0, t.num_cells - self.sw))
+        self.sy = ForceBetween(0, sy + num_rows, max(0, t.num_rows - self.sh))
+        if (sx, sy) == (self.sx, self.sy):
+            return
+        self.pixel_offset_y = 0
+        self.MouseToRow(mouseY)
+        self.MouseToCol(mouseX)
         self.update_selection()
 
-##-------------------------- Mouse off screen functions
-
-    def HandleAboveScreen(self, row):
-        self.SetScrollTimer()
-        if self.CanScroll():
-            row = self.sy - 1
-            row = max(0, row)
-            self.cy = row
-
-    def HandleBelowScreen(self, row):
-        self.SetScrollTimer()
-        if self.CanScroll():
-            row = self.sy + self.sh + 1
-            row  = min(row, self.table.num_rows - 1)
-            self.cy = row
-
-    def HandleLeftOfScreen(self, col):
-        self.SetScrollTimer()
-        if self.CanScroll():
-            col = self.sx - 1
-            col = max(0,col)
-            self.cx = col
-
-    def HandleRightOfScreen(self, col):
-        self.SetScrollTimer()
-        if self.CanScroll():
-            col = self.sx + self.sw + 1
-            col = min(col, self.current_line_length - 1)
-            self.cx = col
-
 ##------------------------ mousing functions
 
+    # Positions outside the window are pinned to the edge rows and cells;
+    # the autoscroller is responsible for moving the view in that case.
+
     def MouseToRow(self, mouseY):
-        row  = self.sy + int(mouseY / self.cell_height_in_pixels)
-        if self.AboveScreen(row):
-            self.HandleAboveScreen(row)
-        elif self.BelowScreen(row):
-            self.HandleBelowScreen(row)
-        else:
-            self.cy  = min(row, self.table.num_rows - 1)
+        row  = self.sy + int((mouseY + self.pixel_offset_y) // self.cell_height_in_pixels)
+        row = ForceBetween(self.sy, row, self.sy + max(0, self.sh - 1))
+        self.cy = ForceBetween(0, row, self.table.num_rows - 1)
 
     def MouseToCol(self, mouseX):
-        cell = self.sx + int(mouseX / self.cell_width_in_pixels)
-        if self.LeftOfScreen(cell):
-            self.HandleLeftOfScreen(cell)
-        elif self.RightOfScreen(cell):
-            self.HandleRightOfScreen(cell)
-        else:
-            self.cx = min(cell, self.current_line_length)
+        cell = self.sx + int(mouseX // self.cell_width_in_pixels)
+        cell = ForceBetween(self.sx, cell, self.sx + max(0, self.sw - 1))
+        self.cx = min(cell, self.current_line_length)
         # MouseToRow must be called first so the cursor is in the correct row
         self.cx = self.table.enforce_valid_cursor(self.cy, self.cx)
 
@@ -435,11 +834,13 @@ class FixedFontDataWindow(wx.ScrolledWindow):
         if event.LeftIsDown() and self.HasCapture():
             self.Selecting = True
             self.MouseToCaret(event)
+            self.autoscroller.update(event.GetX(), event.GetY())
             self.update_selection()
 
     def OnLeftDown(self, event):
         self.MouseToCaret(event)
-        self.start_selection()
+        # ctrl (cmd on mac) adds to the selection, alt selects a block
+        self.start_selection(event.CmdDown(), event.AltDown())
         self.UpdateView()
         self.CaptureMouse()
         self.SetFocus()
@@ -455,7 +856,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             self.SelectNotify(False, self.SelectBegin, self.SelectEnd)
 
         self.ReleaseMouse()
-        self.scrollTimer.Stop()
+        self.autoscroller.stop()
 
 
 #------------------------- Scrolling
@@ -579,16 +980,56 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             print(key)
             event.Skip()
 
+##----------- zoom
+
+    def zoom_in(self):
+        self.set_zoom(self.zoom_index + 1)
+
+    def zoom_out(self):
+        self.set_zoom(self.zoom_index - 1)
+
+    def get_renderers(self):
+        renderers = []
+        for r in [self.text_renderer, self.table.default_renderer] + list(self.table.hex_renderers.values()):
+            if r is not None and r not in renderers:
+                renderers.append(r)
+        return renderers
+
+    def set_zoom(self, index):
+        """Switch to another level of the zoom ladder, keeping the caret on
+        the same row of the window.
+        """
+        index = ForceBetween(0, index, len(self.zoom_ladder) - 1)
+        if index == self.zoom_index:
+            return
+        caret_row = self.cy - self.sy
+        self.zoom_index = index
+        level = self.zoom_ladder[index]
+        self.set_font_metrics(level)
+        for r in self.get_renderers():
+            r.set_font(level.font)
+        self.SetCharDimensions()
+        if not 0 <= caret_row < self.sh:
+            caret_row = self.sh // 2
+        self.sy = self.cy - caret_row
+        self.pixel_offset_y = 0
+        self.VertBoundaries()
+        self.HorizBoundaries()
+        self.invalidate_all()
+        self.AdjustScrollbars()
+        self.parent_scrolled_window.on_zoom_changed()
+        self.schedule_update("zoom")
+
 ##----------- selection routines
 
-    def start_selection(self):
+    def start_selection(self, add=False, block=False):
         self.SelectBegin = (self.cy, self.cx)
         self.SelectEnd = None
 
     def update_selection(self):
         self.SelectEnd = (self.cy, self.cx)
         self.SelectNotify(self.Selecting, self.SelectBegin, self.SelectEnd)
-        self.UpdateView()
+        self.schedule_update("selection")
 
     def SelectOff(self):
         self.SelectBegin = None
@@ -601,7 +1042,7 @@ class FixedFontDataWindow(wx.ScrolledWindow):
     def OnDestroy(self, event):
         self.mdc = None
         self.odc = None
-        self.scrollTimer = None
+        self.autoscroller.stop()
         self.eofMarker = None
 
 #--------------------  Abstract methods for subclasses
@@ -612,12 +1053,6 @@ class FixedFontDataWindow(wx.ScrolledWindow):
     def SelectNotify(self, Selecting, SelectionBegin, SelectionEnd):
         pass
 
-    def zoom_in(self):
-        pass
-
-    def zoom_out(self):
-        pass
-
     #### Overrides
 
     def DrawCaret(self, dc = None):
@@ -636,11 +1071,11 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             dc = wx.ClientDC(self)
 
         t = self.table
-        col = t.cell_to_col[cell_x]
+        col = t.get_col_of_cell(cell_x)
         num_cells = t.col_widths[col]
         w = (num_cells * self.cell_width_in_pixels) + 2
         h = self.cell_height_in_pixels + 1
-        cell_x = t.col_to_cell[col]
+        cell_x = int(t.col_to_cell[col])
         x = (cell_x * self.cell_width_in_pixels) - 1
         y = (cell_y * self.cell_height_in_pixels)
         self.draw_caret(dc, x, y, w, h)
@@ -665,7 +1100,12 @@ class FixedFontDataWindow(wx.ScrolledWindow):
     def DrawEditText(self, t, style, x, y, dc):
         #dc.DrawText(t, x * self.cell_width_in_pixels, y * self.cell_height_in_pixels)
         rect = wx.Rect(x * self.cell_width_in_pixels, y * self.cell_height_in_pixels, len(t) * self.cell_width_in_pixels, self.cell_height_in_pixels)
+        stats = self.render_stats
+        if stats.in_frame:
+            start_time = time.perf_counter()
         self.text_renderer.draw_text(dc, rect, t, style)
+        if stats.in_frame:
+            stats.add_time("blit", start_time)
 
     def DrawLine(self, sy, line, dc):
         if self.IsLine(line):
@@ -676,18 +1116,124 @@ class FixedFontDataWindow(wx.ScrolledWindow):
             style = style[self.sx:]
             self.DrawEditText(t, style, 0, sy - self.sy, dc)
 
+    def scroll_backing_store(self, num_cells, num_rows):
+        """Shift the contents of the backing store to account for a scroll
+        of num_cells and num_rows, and mark the newly exposed rows and cells
+        for drawing. Positive values scroll toward the end of the data.
+        """
+        w, h = self.backing_store.GetSize()
+        dx = num_cells * self.cell_width_in_pixels
+        dy = num_rows * self.cell_height_in_pixels
+        if abs(dx) >= w or abs(dy) >= h:
+            self.full_redraw = True
+            return
+        if self.scroll_buffer is None or self.scroll_buffer.GetSize() != (w, h):
+            self.scroll_buffer = wx.Bitmap(w, h)
+        src = wx.MemoryDC(self.backing_store)
+        dest = wx.MemoryDC(self.scroll_buffer)
+        dest.SetBackground(wx.Brush(self.settings_obj.empty_color))
+        dest.Clear()
+        dest.Blit(max(0, -dx), max(0, -dy), w - abs(dx), h - abs(dy), src, max(0, dx), max(0, dy))
+        # rows pushed below the last drawn row would otherwise be left
+        # partially visible at the bottom edge
+        bottom = self.num_drawn_rows * self.cell_height_in_pixels
+        dest.SetBrush(wx.Brush(self.settings_obj.empty_color))
+        dest.SetPen(wx.TRANSPARENT_PEN)
+        dest.DrawRectangle(0, bottom, w, h - bottom)
+        del src, dest
+        self.backing_store, self.scroll_buffer = self.scroll_buffer, self.backing_store
+        scroll_log.debug("scrolled backing store by %d cells, %d rows", num_cells, num_rows)
+
+        if num_rows > 0:
+            last_row = self.sy + self.num_drawn_rows - 1
+            self.invalidate_rows(last_row + 1 - num_rows, last_row)
+        elif num_rows < 0:
+            self.invalidate_rows(self.sy, self.sy - num_rows - 1)
+        if num_cells != 0:
+            visible_cells = (w + self.cell_width_in_pixels - 1) // self.cell_width_in_pixels
+            if num_cells > 0:
+                first = (w - dx) // self.cell_width_in_pixels
+                self.exposed_cells = (self.sx + first, visible_cells - first)
+            else:
+                self.exposed_cells = (self.sx, -num_cells)
+
+    def ClearLines(self, line, num_lines, dc):
+        dc.SetBrush(wx.Brush(self.settings_obj.empty_color))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        y = (line - self.sy) * self.cell_height_in_pixels
+        dc.DrawRectangle(0, y, self.backing_store.GetWidth(), num_lines * self.cell_height_in_pixels)
+
+    @property
+    def num_drawn_cells(self):
+        w = self.backing_store.GetWidth()
+        return (w + self.cell_width_in_pixels - 1) // self.cell_width_in_pixels
+
+    def DrawAllLines(self, dc):
+        dc.SetBackground(wx.Brush(self.settings_obj.empty_color))
+        dc.Clear()
+        if self.render_stats.in_frame:
+            self.render_stats.add_drawn(self.num_drawn_rows, self.num_drawn_cells)
+        for line in range(self.sy, self.sy + self.num_drawn_rows):
+            self.DrawLine(line, line, dc)
+
+    def DrawDirtyLines(self, lines, dc):
+        if self.render_stats.in_frame:
+            self.render_stats.add_drawn(len(lines), self.num_drawn_cells)
+        for line in lines:
+            self.ClearLines(line, 1, dc)
+            self.DrawLine(line, line, dc)
+
+    def DrawExposedCells(self, cell, num_cells, dc):
+        # the exposed strip has already been cleared by the scroll, so just
+        # draw the lines clipped to it
+        if self.render_stats.in_frame:
+            self.render_stats.add_drawn(self.num_drawn_rows, num_cells)
+        x = (cell - self.sx) * self.cell_width_in_pixels
+        dc.SetClippingRegion(x, 0, num_cells * self.cell_width_in_pixels, self.backing_store.GetHeight())
+        for line in range(self.sy, self.sy + self.num_drawn_rows):
+            self.DrawLine(line, line, dc)
+        dc.DestroyClippingRegion()
+
     def Draw(self, odc=None):
         if not odc:
             odc = wx.ClientDC(self)
 
-        dc = wx.BufferedDC(odc)
+        stats = self.render_stats
+        if stats.enabled:
+            stats.begin_frame(self.get_renderer_caches())
+        # prepare_backing_store decides whether a resize, zoom or long jump
+        # needs everything redrawn
+        self.prepare_backing_store()
+        full_redraw = self.full_redraw
+        dc = wx.MemoryDC(self.backing_store)
         if dc.IsOk():
             dc.SetBackgroundMode(wx.SOLID)
-            dc.SetBackground(wx.Brush(self.settings_obj.empty_color))
-            dc.Clear()
-            for line in range(self.sy, self.sy + self.sh + 1):
-                self.DrawLine(line, line, dc)
+            if self.full_redraw:
+                self.DrawAllLines(dc)
+            else:
+                if self.exposed_cells:
+                    self.DrawExposedCells(self.exposed_cells[0], self.exposed_cells[1], dc)
+                if self.dirty_rows:
+                    self.DrawDirtyLines(sorted(self.dirty_rows), dc)
             self.DrawCaret(dc)
+            self.full_redraw = False
+            self.dirty_rows = set()
+            self.exposed_cells = None
+            w, h = self.GetClientSize()
+            if stats.in_frame:
+                start_time = time.perf_counter()
+            odc.Blit(0, 0, w, h, dc, 0, self.pixel_offset_y)
+            if stats.in_frame:
+                stats.add_time("blit", start_time)
+        if stats.in_frame:
+            stats.end_frame(full_redraw)
+
+    def get_renderer_caches(self):
+        caches = []
+        for r in self.get_renderers():
+            if r.cache not in caches:
+                caches.append(r.cache)
+        return caches
 
 
 class FixedFontTextWindow(FixedFontDataWindow):
@@ -718,7 +1264,7 @@ class HexByteImageCache(DrawTextImageCache):
             bmp = wx.Bitmap(rect.width, rect.height)
             mdc = wx.MemoryDC()
             mdc.SelectObject(bmp)
-            t = "%02x" % text
+            t = hex_byte_text[text]
             v = self.view_obj
             r = wx.Rect(v.view_params.pixel_width_padding, 0, v.fw * 2, rect.height)
             bg_rect = wx.Rect(0, 0, rect.width, rect.height)
@@ -728,27 +1274,205 @@ class HexByteImageCache(DrawTextImageCache):
         dc.DrawBitmap(bmp, rect.x, rect.y)
 
     def draw_text(self, dc, rect, text, style, num_cells=1):
-        draw_log.debug(str((rect, text)))
+        self.select_zoom()
         rect.width = num_cells * self.view_obj.cell_width_in_pixels
-        for i, c in enumerate(text):
-            draw_log.debug(str((i, c, rect)))
-            self.draw_cached_text(dc, rect, c, style[i])
+        # plain ints are much cheaper to hash than numpy scalars
+        text = np.asarray(text, dtype=np.uint8).tolist()
+        style = np.asarray(style, dtype=np.uint8).tolist()
+        for c, s in zip(text, style):
+            self.draw_cached_text(dc, rect, c, s)
             rect.x += rect.width
 
 
+class HexByteGlyphAtlas(HexByteImageCache):
+    """Hex byte renderer that prerenders every (byte value, style) pair into
+    a single numpy pixel atlas so that an entire row (or the entire viewport)
+    can be composed in memory and sent to the screen with one DrawBitmap
+    instead of one blit per byte.
+
+    Only the background priority and the diff foreground of the style byte
+    affect the rendered pixels, so the 256 possible style values collapse to
+    a small number of visual styles, each of which gets 256 glyphs.
+    """
+    def __init__(self, machine, view_obj, font=None):
+        HexByteImageCache.__init__(self, machine, view_obj, font)
+        self.calc_style_lut()
+
+    def invalidate(self):
+        HexByteImageCache.invalidate(self)
+        self.atlases = {}
+
+    def set_colors(self, m):
+        HexByteImageCache.set_colors(self, m)
+        self.empty_background = m.empty_color
+        self.atlases = {}
+
+    def classify_style(self, style):
+        for mask in [selected_bit_mask, match_bit_mask, comment_bit_mask, user_bit_mask]:
+            if style & mask:
+                break
+        else:
+            mask = 0
+        return mask | (style & diff_bit_mask)
+
+    def calc_style_lut(self):
+        self.visual_styles = []
+        self.style_lut = np.empty(256, dtype=np.intp)
+        for style in range(256):
+            visual = self.classify_style(style)
+            try:
+                i = self.visual_styles.index(visual)
+            except ValueError:
+                i = len(self.visual_styles)
+                self.visual_styles.append(visual)
+            self.style_lut[style] = i * 256
+        self.blank_glyph = len(self.visual_styles) * 256
+
+    def iter_build_atlas(self, level):
+        """Render all glyphs for a zoom level into an array of shape
+        (num_glyphs, height, width, 3), with one extra glyph at the end
+        filled with the empty color for use outside the valid data.
+
+        This is a generator that yields after each visual style so the work
+        can be spread over idle time; the finished atlas is stored in
+        `atlases`, keyed by the zoom level's key.
+        """
+        width, height = level.cell_width_in_pixels, level.cell_height_in_pixels
+        atlases = self.atlases
+        if level.key in atlases:
+            return
+        atlas = np.empty((self.blank_glyph + 1, height, width, 3), dtype=np.uint8)
+        bmp = wx.Bitmap(width, height)
+        mdc = wx.MemoryDC()
+        r = wx.Rect(self.view_obj.view_params.pixel_width_padding, 0, level.fw * 2, height)
+        bg_rect = wx.Rect(0, 0, width, height)
+        glyph = 0
+        for style in self.visual_styles:
+            for byte in range(256):
+                mdc.SelectObject(bmp)
+                self.draw_text_to_dc(mdc, bg_rect, r, hex_byte_text[byte], style, level.font)
+                mdc.SelectObject(wx.NullBitmap)
+                bmp.CopyToBuffer(atlas[glyph], wx.BitmapBufferFormat_RGB)
+                glyph += 1
+            yield
+        atlas[self.blank_glyph] = self.empty_background[0:3]
+        draw_log.debug("built %dx%d glyph atlas for %d styles", width, height, len(self.visual_styles))
+        atlases[level.key] = atlas
+
+    def build_atlas(self, level):
+        for _ in self.iter_build_atlas(level):
+            pass
+
+    def get_atlas(self):
+        """Return the atlas of the view's current zoom level, or None if it
+        hasn't been built yet.
+        """
+        return self.atlases.get(self.view_obj.zoom_level.key)
+
+    def glyph_indices(self, data, style, out=None):
+        """Convert a slice of bytes and their styles to atlas glyph indices,
+        optionally writing into an existing intp array.
+        """
+        glyphs = np.take(self.style_lut, style, out=out)
+        glyphs += data
+        return glyphs
+
+    def compose_glyphs(self, glyphs):
+        """Build a bitmap from a 2D array of glyph indices (rows x cells),
+        or None if the array is empty.
+        """
+        num_rows, num_cells = glyphs.shape
+        if num_rows == 0 or num_cells == 0:
+            return None
+        atlas = self.get_atlas()
+        _, h, w, _ = atlas.shape
+        pixels = atlas[glyphs].transpose(0, 2, 1, 3, 4)
+        pixels = np.ascontiguousarray(pixels).reshape(num_rows * h, num_cells * w * 3)
+        return wx.Bitmap.FromBuffer(num_cells * w, num_rows * h, pixels)
+
+    def draw_glyphs(self, dc, x, y, glyphs):
+        """Draw a 2D array of glyph indices (rows x cells) with its upper
+        left corner at pixel position x, y using a single blit.
+        """
+        bmp = self.compose_glyphs(glyphs)
+        if bmp is not None:
+            dc.DrawBitmap(bmp, x, y)
+
+    def draw_text(self, dc, rect, text, style, num_cells=1):
+        if num_cells != 1 or self.get_atlas() is None:
+            # glyphs are a single cell wide, so multi-cell columns use the
+            # per-item bitmap cache, as does any zoom level whose atlas is
+            # still being built
+            HexByteImageCache.draw_text(self, dc, rect, text, style, num_cells)
+            return
+        glyphs = self.glyph_indices(np.asarray(text, dtype=np.uint8), np.asarray(style, dtype=np.uint8))
+        self.draw_glyphs(dc, rect.x, rect.y, glyphs.reshape(1, -1))
+
+
 class FixedFontNumpyWindow(FixedFontDataWindow):
+    search_engine = None
+    diff_engine = None
+
+    prebuild_delay = 10  # milliseconds between slices of atlas building
+    prebuild_steps = None
+    prebuild_slice = 0.008  # seconds
+
     def init_renderers(self):
-        self.text_renderer = self.table.create_renderer(None, self.settings_obj, self)
+        self.text_renderer = self.table.create_renderer(0, self.settings_obj, self)
+        self.start_prebuild()
 
     @property
     def current_line_length(self):
         return self.table.num_cells
 
-    def start_selection(self):
+    def start_prebuild(self):
+        """Build the glyph atlases of all zoom levels, nearest levels first,
+        in short slices while the event loop is idle so zooming never has
+        to wait for glyphs to be rendered.
+        """
+        self.cancel_prebuild()
+        if self.uses_glyph_atlas:
+            self.prebuild_steps = self.iter_prebuild_atlases()
+            wx.CallLater(self.prebuild_delay, self.on_prebuild_step, self.prebuild_steps)
+
+    def cancel_prebuild(self):
+        # a pending step sees that prebuild_steps changed and stops
+        self.prebuild_steps = None
+
+    def iter_prebuild_atlases(self):
+        order = sorted(range(len(self.zoom_ladder)), key=lambda i: abs(i - self.zoom_index))
+        for i in order:
+            for step in self.text_renderer.iter_build_atlas(self.zoom_ladder[i]):
+                yield
+
+    def on_prebuild_step(self, steps):
+        if not self or steps is not self.prebuild_steps:
+            # window destroyed or prebuild restarted
+            return
+        deadline = time.time() + self.prebuild_slice
+        for _ in steps:
+            if time.time() > deadline:
+                wx.CallLater(self.prebuild_delay, self.on_prebuild_step, steps)
+                return
+        self.prebuild_steps = None
+
+    def start_selection(self, add=False, block=False):
+        if add:
+            self.commit_selection()
+        else:
+            self.clear_selected_ranges()
         self.SelectBegin, self.SelectEnd = self.table.get_index_range(self.cy, self.cx)
         self.anchor_start_index, self.anchor_end_index = self.SelectBegin, self.SelectEnd
+        if block:
+            self.block_anchor = (self.cy, self.cx)
+            self.block_ranges = IntervalIndex([self.SelectBegin], [self.SelectEnd])
+        else:
+            self.block_anchor = None
 
     def update_selection(self):
+        if self.block_anchor is not None:
+            self.update_block_selection()
+            return
         index1, index2 = self.table.get_index_range(self.cy, self.cx)
         if index1 < self.anchor_start_index:
             self.SelectBegin = index1
@@ -757,18 +1481,128 @@ class FixedFontNumpyWindow(FixedFontDataWindow):
             self.SelectBegin = self.anchor_start_index
             self.SelectEnd = index2
         self.SelectNotify(self.Selecting, self.SelectBegin, self.SelectEnd)
-        self.UpdateView()
+        self.schedule_update("selection")
+
+    def update_block_selection(self):
+        row, cell = self.block_anchor
+        old_ranges = self.block_ranges
+        self.block_ranges = IntervalIndex(*self.table.get_block_ranges(row, cell, self.cy, self.cx))
+        self.invalidate_ranges(old_ranges)
+        self.invalidate_ranges(self.block_ranges)
+        starts, ends = self.block_ranges.ranges
+        if len(starts):
+            self.SelectBegin, self.SelectEnd = int(starts[0]), int(ends[-1])
+        self.SelectNotify(self.Selecting, self.SelectBegin, self.SelectEnd)
+        self.schedule_update("selection")
+
+    def SelectOff(self):
+        self.clear_selected_ranges()
+        self.block_anchor = None
+        FixedFontDataWindow.SelectOff(self)
+
+    def commit_selection(self):
+        """Move the current selection into the selected ranges, so a new
+        range can be started without losing it.
+        """
+        if self.block_ranges is not None:
+            self.selected_ranges.add_ranges(*self.block_ranges.ranges)
+            # the bounding range of the block must not be drawn as linear
+            self.SelectBegin = self.SelectEnd = None
+            self.block_ranges = None
+            self.block_anchor = None
+        elif self.SelectBegin is not None and self.SelectEnd is not None:
+            self.selected_ranges.add_ranges([self.SelectBegin], [self.SelectEnd])
+
+    def clear_selected_ranges(self):
+        for ranges in (self.selected_ranges, self.block_ranges):
+            if ranges is not None:
+                self.invalidate_ranges(ranges)
+        self.selected_ranges = IntervalIndex()
+        self.block_ranges = None
+
+    def select_ranges(self, starts, ends):
+        """Add any number of [start, end) index ranges to the selection"""
+        self.commit_selection()
+        new_ranges = IntervalIndex(starts, ends)
+        self.selected_ranges.add_ranges(*new_ranges.ranges)
+        self.invalidate_ranges(new_ranges)
+        self.schedule_update("selection")
+
+    def select_all_matches(self):
+        if self.search_engine is not None:
+            self.select_ranges(*self.search_engine.matches.ranges)
+
+    def get_selected_ranges(self):
+        """Return the (starts, ends) arrays of all selected data, merged
+        into sorted, disjoint ranges.
+        """
+        ranges = IntervalIndex(*self.selected_ranges.ranges)
+        if self.block_ranges is not None:
+            ranges.add_ranges(*self.block_ranges.ranges)
+        elif self.SelectBegin is not None and self.SelectEnd is not None:
+            ranges.add_ranges([self.SelectBegin], [self.SelectEnd])
+        return ranges.ranges
+
+    def invalidate_ranges(self, ranges):
+        """Mark the visible rows touched by an IntervalIndex for repainting"""
+        index, _ = self.table.get_index_range(self.sy, 0)
+        last_index, _ = self.table.get_index_range(self.sy + self.num_drawn_rows, 0)
+        for start, end in zip(*ranges.query(index, last_index)):
+            self.invalidate_index_range(max(start, index), min(end, last_index))
 
     def get_style_array(self, index, last_index):
-        count = last_index - index
-        style = np.zeros(count, dtype=np.uint8)
-        if last_index < self.SelectBegin or index >= self.SelectEnd:
-            pass
+        return self.style[index:last_index]
+
+    def set_bytes(self, index, values):
+        self.invalidate_index_range(*self.table.set_bytes(index, values))
+        self.schedule_update("data")
+
+    def start_search(self, pattern, mode="text", ignore_case=False):
+        if self.search_engine is None:
+            self.search_engine = SearchEngine(self.table, self.on_scan_progress)
+        self.search_engine.start(pattern, mode, ignore_case)
+
+    def cancel_search(self):
+        if self.search_engine is not None:
+            self.search_engine.clear()
+            self.invalidate_all()
+            self.UpdateView()
+
+    def on_scan_progress(self, index, last_index):
+        # only matches in the visible range cause a repaint
+        if self:
+            self.invalidate_index_range(index, last_index)
+            if self.dirty_rows:
+                self.schedule_update("data")
+
+    def find_next_match(self, forward=True):
+        if self.search_engine is not None:
+            self.jump_to_next_range(self.search_engine.matches, forward)
+
+    def find_next_diff(self, forward=True):
+        if self.diff_engine is not None:
+            self.jump_to_next_range(self.diff_engine.matches, forward)
+
+    def jump_to_next_range(self, ranges, forward=True):
+        index, _ = self.table.get_index_range(self.cy, self.cx)
+        if forward:
+            found = ranges.find_next(index)
         else:
-            for i in range(index, last_index):
-                if i >= self.SelectBegin and i < self.SelectEnd:
-                    style[i - index] = selected_bit_mask
-        return style
+            found = ranges.find_prev(index)
+        if found is not None:
+            self.cy, self.cx = self.table.get_row_cell_of_index(found)
+            self.KeepCaretOnScreen()
+            self.UpdateView()
+
+    def undo(self):
+        if self.table.data.can_undo:
+            self.invalidate_index_range(*self.table.undo())
+            self.schedule_update("data")
+
+    def redo(self):
+        if self.table.data.can_redo:
+            self.invalidate_index_range(*self.table.redo())
+            self.schedule_update("data")
 
     def DrawLine(self, sy, line, dc):
         if self.IsLine(line):
@@ -788,64 +1622,667 @@ class FixedFontNumpyWindow(FixedFontDataWindow):
 
             d = self.lines[index:last_index]
             style = self.style[index:last_index]
-            text = ["%02x" % x for x in d]
-            self.DrawEditText(text, style, cell_start - self.sx, sy - self.sy, dc)
+            self.DrawEditText(d, style, cell_start - self.sx, sy - self.sy, dc)
+
+    def get_viewport_glyphs(self, first_row, num_rows):
+        """Glyph indices for num_rows full rows starting at first_row, with
+        the blank glyph used for any position outside the valid data.
+        """
+        t = self.table
+        r = self.text_renderer
+        first_index = first_row * t.bytes_per_row - t.start_offset
+        count = num_rows * t.bytes_per_row
+        glyphs = np.empty(count, dtype=np.intp)
+        glyphs.fill(r.blank_glyph)
+        index = max(0, first_index)
+        last_index = min(t.last_valid_index, first_index + count)
+        if last_index > index:
+            d = self.lines[index:last_index]
+            style = self.style[index:last_index]
+            r.glyph_indices(d, style, glyphs[index - first_index:last_index - first_index])
+        return glyphs.reshape(num_rows, t.bytes_per_row)
 
+    @property
+    def uses_glyph_atlas(self):
+        return self.settings_obj.use_glyph_atlas
 
-class FixedFontMultiCellNumpyWindow(FixedFontNumpyWindow):
-    def start_selection(self):
-        self.SelectBegin, self.SelectEnd = self.table.get_index_range(self.cy, self.cx)
-        self.anchor_start_index, self.anchor_end_index = self.SelectBegin, self.SelectEnd
+    def can_draw_glyphs(self):
+        """Whether rows can be composed from the glyph atlas of the current
+        zoom level. Until it has been built in the background the rows are
+        drawn through the bitmap cache, so zooming never waits for glyphs.
+        """
+        if not self.uses_glyph_atlas:
+            return False
+        if self.text_renderer.get_atlas() is not None:
+            return True
+        if self.prebuild_steps is None:
+            # atlases were thrown away (e.g. new colors); build them again
+            self.start_prebuild()
+        return False
+
+    def invalidate_index_range(self, index, last_index):
+        if last_index > index:
+            t = self.table
+            self.invalidate_rows(t.get_row_of_index(index), t.get_row_of_index(last_index - 1))
+
+    def invalidate_selection(self, old_selection, new_selection):
+        # only the part of the data that changed selection state needs to
+        # be repainted
+        (a, b), (c, d) = old_selection, new_selection
+        if a is None or b is None:
+            if c is not None and d is not None:
+                self.invalidate_index_range(c, d)
+        elif c is None or d is None:
+            self.invalidate_index_range(a, b)
+        elif b <= c or d <= a:
+            self.invalidate_index_range(a, b)
+            self.invalidate_index_range(c, d)
+        else:
+            self.invalidate_index_range(min(a, c), max(a, c))
+            self.invalidate_index_range(min(b, d), max(b, d))
+
+    def DrawGlyphLines(self, line, num_lines, dc, cell=None, num_cells=None):
+        glyphs = self.get_viewport_glyphs(line, num_lines)
+        if cell is None:
+            cell = self.sx
+            num_cells = glyphs.shape[1]
+        x = (cell - self.sx) * self.cell_width_in_pixels
+        y = (line - self.sy) * self.cell_height_in_pixels
+        glyphs = glyphs[:,cell:cell + num_cells]
+        stats = self.render_stats
+        if not stats.in_frame:
+            self.text_renderer.draw_glyphs(dc, x, y, glyphs)
+            return
+        stats.add_drawn(*glyphs.shape)
+        start_time = time.perf_counter()
+        bmp = self.text_renderer.compose_glyphs(glyphs)
+        stats.add_time("compose", start_time)
+        if bmp is not None:
+            start_time = time.perf_counter()
+            dc.DrawBitmap(bmp, x, y)
+            stats.add_time("blit", start_time)
+
+    def DrawAllLines(self, dc):
+        if not self.can_draw_glyphs():
+            FixedFontDataWindow.DrawAllLines(self, dc)
+            return
+        dc.SetBackground(wx.Brush(self.settings_obj.empty_color))
+        dc.Clear()
+        self.DrawGlyphLines(self.sy, self.num_drawn_rows, dc)
 
-    def update_selection(self):
-        index1, index2 = self.table.get_index_range(self.cy, self.cx)
-        if index1 < self.anchor_start_index:
-            self.SelectBegin = index1
-            self.SelectEnd = self.anchor_end_index
-        elif index2 > self.anchor_end_index:
-            self.SelectBegin = self.anchor_start_index
-            self.SelectEnd = index2
-        self.SelectNotify(self.Selecting, self.SelectBegin, self.SelectEnd)
-        self.UpdateView()
+    def DrawExposedCells(self, cell, num_cells, dc):
+        if not self.can_draw_glyphs():
+            FixedFontDataWindow.DrawExposedCells(self, cell, num_cells, dc)
+            return
+        self.DrawGlyphLines(self.sy, self.num_drawn_rows, dc, cell, num_cells)
 
+    def DrawDirtyLines(self, lines, dc):
+        if not self.can_draw_glyphs():
+            FixedFontDataWindow.DrawDirtyLines(self, lines, dc)
+            return
+        # consecutive dirty lines are drawn with a single blit
+        start = count = 0
+        for line in lines + [None]:
+            if count and line == start + count:
+                count += 1
+                continue
+            if count:
+                self.ClearLines(start, count, dc)
+                self.DrawGlyphLines(start, count, dc)
+            start, count = line, 1
+
+
+class FixedFontMultiCellNumpyWindow(FixedFontNumpyWindow):
     def DrawEditText(self, t, style, start_x, show_at_x, x_width, y, dc):
         #dc.DrawText(t, x * self.cell_width_in_pixels, y * self.cell_height_in_pixels)
-        draw_log.debug("DRAWEDIT: %d %d %d" % (start_x, show_at_x, x_width))
         rect = wx.Rect(show_at_x * self.cell_width_in_pixels, y * self.cell_height_in_pixels, x_width * self.cell_width_in_pixels, self.cell_height_in_pixels)
-        self.table.hex_renderer.draw_text(dc, rect, [t], [style], x_width)
+        stats = self.render_stats
+        if stats.in_frame:
+            start_time = time.perf_counter()
+        self.text_renderer.draw_text(dc, rect, [t], [style], x_width)
+        if stats.in_frame:
+            stats.add_time("blit", start_time)
 
     def DrawLine(self, sy, line, dc):
         if self.IsLine(line):
             # import pdb; pdb.set_trace()
             t = self.table
-            start_col = t.cell_to_col[self.sx]
+            # only columns that intersect the window are drawn
+            start_col, end_col = t.get_visible_cols(self.sx, self.sw + 2)
             index = line * t.items_per_row
-            last_index = (line + 1) * t.items_per_row
+            last_index = min((line + 1) * t.items_per_row, t.last_valid_index)
             data = self.lines[index:last_index]
             style = self.style[index:last_index]
-            for col in range(start_col, t.items_per_row):
-                cell_start = t.col_to_cell[col]
+            for col in range(start_col, min(end_col, len(data))):
+                cell_start = int(t.col_to_cell[col])
                 cell_width = t.col_widths[col]
                 self.DrawEditText(data[col], style[col], cell_start, cell_start - self.sx, cell_width, sy - self.sy, dc)
 
+    # variable width columns can't be composed from the single-cell glyph
+    # atlas, so always draw line by line
+    uses_glyph_atlas = False
+
+
+def as_byte_array(data):
+    """Return a uint8 numpy view of data without copying it, if data
+    supports the buffer protocol (bytes, bytearray, mmap, memoryview, numpy
+    arrays including np.memmap). Anything else is returned unchanged.
+    """
+    if isinstance(data, np.ndarray):
+        return data
+    try:
+        return np.frombuffer(data, dtype=np.uint8)
+    except (TypeError, ValueError):
+        return data
+
+
+class EditOverlay(object):
+    """Sparse edit layer over a read-only data source.
+
+    Edits are stored as a sorted list of non-overlapping patches, so the
+    source (which may be a multi-gigabyte memory map) is never copied or
+    modified. Reading a slice costs a binary search plus the patches that
+    intersect it; slices without any edits are returned as views of the
+    source. Each undo/redo entry holds only the bytes of its own edit.
+
+    The background scanners read the data from worker threads, so the
+    patch list is never modified in place: each edit builds new lists and
+    replaces the (starts, patches) pair with a single assignment, and
+    readers work from the pair they fetched.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.edits = ([], [])
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def __len__(self):
+        return len(self.source)
+
+    def get_range(self, item):
+        if isinstance(item, slice):
+            index, last_index, step = item.indices(len(self))
+            if step != 1:
+                raise IndexError("only contiguous slices are supported")
+            return index, max(index, last_index)
+        if item < 0:
+            item += len(self)
+        if item < 0 or item >= len(self):
+            raise IndexError("index %d out of range" % item)
+        return item, item + 1
+
+    def __getitem__(self, item):
+        index, last_index = self.get_range(item)
+        data = self.read(index, last_index)
+        if isinstance(item, slice):
+            return data
+        return data[0]
+
+    def __setitem__(self, item, values):
+        index, last_index = self.get_range(item)
+        values = np.asarray(values, dtype=np.uint8).ravel()
+        if len(values) == 1 and last_index - index > 1:
+            values = np.repeat(values, last_index - index)
+        self.write(index, values)
+
+    @property
+    def is_modified(self):
+        return len(self.edits[0]) > 0
+
+    def read(self, index, last_index):
+        starts, patches = self.edits
+        i = max(0, bisect_right(starts, index) - 1)
+        data = None
+        while i < len(starts) and starts[i] < last_index:
+            start = starts[i]
+            patch = patches[i]
+            end = start + len(patch)
+            if end > index:
+                if data is None:
+                    data = np.array(self.source[index:last_index], dtype=np.uint8)
+                lo = max(start, index)
+                hi = min(end, last_index)
+                data[lo - index:hi - index] = patch[lo - start:hi - start]
+            i += 1
+        if data is None:
+            return self.source[index:last_index]
+        return data
+
+    def apply(self, index, values):
+        last_index = index + len(values)
+        starts, patches = self.edits
+
+        # merge with every patch that overlaps or touches the new range
+        lo = bisect_left(starts, index)
+        if lo > 0 and starts[lo - 1] + len(patches[lo - 1]) >= index:
+            lo -= 1
+        hi = bisect_right(starts, last_index)
+        if lo < hi:
+            start = min(index, starts[lo])
+            end = max(last_index, starts[hi - 1] + len(patches[hi - 1]))
+            patch = np.array(self.read(start, end), dtype=np.uint8)
+            patch[index - start:last_index - start] = values
+        else:
+            start = index
+            patch = np.array(values, dtype=np.uint8)
+
+        # only the runs that differ from the source are kept, so undoing
+        # every edit leaves no patches and reads are views of the source
+        # again
+        changed = patch != np.asarray(self.source[start:start + len(patch)], dtype=np.uint8)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], changed.astype(np.int8), [0]))))
+        new_starts = [start + int(a) for a in edges[0::2]]
+        new_patches = [patch[a:b].copy() for a, b in zip(edges[0::2], edges[1::2])]
+        self.edits = (starts[:lo] + new_starts + starts[hi:], patches[:lo] + new_patches + patches[hi:])
+
+    def write(self, index, values):
+        """Replace the bytes starting at index, returning the affected range
+        as (index, last_index).
+        """
+        values = np.asarray(values, dtype=np.uint8)
+        last_index = index + len(values)
+        if index < 0 or last_index > len(self):
+            raise IndexError("edit %d-%d out of range" % (index, last_index))
+        old = np.array(self.read(index, last_index), dtype=np.uint8)
+        self.apply(index, values)
+        self.undo_stack.append((index, old, values.copy()))
+        self.redo_stack = []
+        return index, last_index
+
+    @property
+    def can_undo(self):
+        return len(self.undo_stack) > 0
+
+    @property
+    def can_redo(self):
+        return len(self.redo_stack) > 0
+
+    def undo(self):
+        index, old, new = self.undo_stack.pop()
+        self.apply(index, old)
+        self.redo_stack.append((index, old, new))
+        return index, index + len(old)
+
+    def redo(self):
+        index, old, new = self.redo_stack.pop()
+        self.apply(index, new)
+        self.undo_stack.append((index, old, new))
+        return index, index + len(new)
+
+    def save(self, filename, chunk_size=1024*1024):
+        with open(filename, "wb") as fh:
+            for index in range(0, len(self), chunk_size):
+                fh.write(self.read(index, min(index + chunk_size, len(self))).tobytes())
+
+
+def merge_ranges(starts, ends):
+    """Merge possibly overlapping [start, end) ranges into a sorted list of
+    disjoint ranges; ranges that touch are combined.
+    """
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    ends = np.maximum.accumulate(ends[order])
+    new_group = np.empty(len(starts), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = starts[1:] > ends[:-1]
+    first = np.flatnonzero(new_group)
+    last = np.append(first[1:] - 1, len(starts) - 1)
+    return starts[first], ends[last]
+
+
+class IntervalIndex(object):
+    """Compact index of sorted, disjoint [start, end) ranges stored as a pair
+    of numpy arrays.
+
+    Queries for a window of the data are two binary searches plus the
+    number of ranges in the window. Ranges can be added from a worker thread
+    while the UI thread is querying: the arrays are replaced, never modified
+    in place, so a query always sees a consistent snapshot.
+
+    Slicing the index returns a uint8 array with 0xff for each byte covered
+    by a range, so it can be used directly as a style layer of a HexTable.
+    """
+    def __init__(self, starts=None, ends=None):
+        self.lock = threading.Lock()
+        if starts is None:
+            starts = ends = np.zeros(0, dtype=np.intp)
+        self.ranges = merge_ranges(np.asarray(starts, dtype=np.intp), np.asarray(ends, dtype=np.intp))
+
+    def __len__(self):
+        return len(self.ranges[0])
+
+    def add_ranges(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.intp)
+        ends = np.asarray(ends, dtype=np.intp)
+        if len(starts) == 0:
+            return
+        with self.lock:
+            old_starts, old_ends = self.ranges
+            if len(old_starts) and starts.min() >= old_starts[-1]:
+                # common case when scanning in order: only the last
+                # existing range can overlap the new ones
+                s, e = merge_ranges(np.append(old_starts[-1:], starts), np.append(old_ends[-1:], ends))
+                self.ranges = (np.append(old_starts[:-1], s), np.append(old_ends[:-1], e))
+            else:
+                self.ranges = merge_ranges(np.append(old_starts, starts), np.append(old_ends, ends))
+
+    def query(self, index, last_index):
+        """Return the (starts, ends) arrays of ranges intersecting
+        [index, last_index).
+        """
+        starts, ends = self.ranges
+        lo = np.searchsorted(ends, index, side="right")
+        hi = np.searchsorted(starts, last_index, side="left")
+        return starts[lo:hi], ends[lo:hi]
+
+    def __getitem__(self, item):
+        index, last_index = item.start, item.stop
+        mask = np.zeros(last_index - index, dtype=np.uint8)
+        for start, end in zip(*self.query(index, last_index)):
+            mask[max(start, index) - index:min(end, last_index) - index] = 0xff
+        return mask
+
+    def find_next(self, index):
+        """Start of the first range beginning after index, or None"""
+        starts = self.ranges[0]
+        i = np.searchsorted(starts, index, side="right")
+        if i < len(starts):
+            return int(starts[i])
+        return None
+
+    def find_prev(self, index):
+        """Start of the last range beginning before index, or None"""
+        starts = self.ranges[0]
+        i = np.searchsorted(starts, index, side="left")
+        if i > 0:
+            return int(starts[i - 1])
+        return None
+
+
+class BackgroundScanner(object):
+    """Base class for scanning table data in chunks on a worker thread.
+
+    Subclasses implement scan_chunk to return the (starts, ends) of the
+    ranges found in a chunk. The ranges are collected in an IntervalIndex
+    that is installed as the `style_mask` style layer of each table, and the
+    callback (called on the UI thread) receives the range of data that has
+    just been scanned so views only repaint if it's visible.
+    """
+    chunk_size = 4 * 1024 * 1024
+    style_mask = 0
+
+    def __init__(self, tables, callback=None):
+        self.tables = tables
+        self.callback = callback
+        self.matches = IntervalIndex()
+        self.thread = None
+        self.cancel_event = threading.Event()
+        self.scanned = 0
+
+    @property
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def scan_length(self):
+        return len(self.tables[0].data)
+
+    def start_scan(self):
+        self.cancel()
+        self.matches = IntervalIndex()
+        self.scanned = 0
+        for table in self.tables:
+            table.set_style_layer(self.style_mask, self.matches)
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.scan, args=(self.matches, self.cancel_event))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def cancel(self):
+        if self.thread is not None:
+            self.cancel_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def clear(self):
+        self.cancel()
+        self.matches = IntervalIndex()
+        for table in self.tables:
+            table.clear_style_layer(self.style_mask)
+
+    def scan(self, matches, cancel_event):
+        size = self.scan_length
+        for index in range(0, size, self.chunk_size):
+            if cancel_event.is_set():
+                return
+            last_index = min(index + self.chunk_size, size)
+            starts, ends = self.scan_chunk(index, last_index)
+            matches.add_ranges(starts, ends)
+            self.scanned = last_index
+            if self.callback is not None:
+                wx.CallAfter(self.callback, index, last_index)
+
+    def scan_chunk(self, index, last_index):
+        raise NotImplementedError("implement scan_chunk() in subclass!")
+
+
+class SearchEngine(BackgroundScanner):
+    """Searches a HexTable for a pattern, highlighting matches with
+    match_bit_mask.
+
+    Chunks overlap by `overlap` bytes so matches spanning a chunk boundary
+    are found; regex matches longer than that may be truncated.
+    """
+    overlap = 256
+    style_mask = match_bit_mask
+
+    def __init__(self, table, callback=None):
+        BackgroundScanner.__init__(self, [table], callback)
+        self.regex = None
+
+    @classmethod
+    def compile(cls, pattern, mode="text", ignore_case=False):
+        """Convert a search string into a compiled bytes regex.
+
+        mode is one of "bytes" (a sequence of byte values), "hex" (hex
+        digits, whitespace ignored), "text" or "regex".
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if mode == "bytes":
+            pattern = re.escape(bytes(bytearray(pattern)))
+        elif mode == "hex":
+            pattern = re.escape(bytes.fromhex("".join(pattern.split())))
+        elif mode == "text":
+            pattern = re.escape(pattern.encode("latin-1"))
+        elif mode == "regex":
+            if not isinstance(pattern, bytes):
+                pattern = pattern.encode("latin-1")
+        else:
+            raise ValueError("unknown search mode %s" % mode)
+        return re.compile(pattern, flags | re.DOTALL)
+
+    def start(self, pattern, mode="text", ignore_case=False):
+        self.cancel()
+        self.regex = self.compile(pattern, mode, ignore_case)
+        self.start_scan()
+
+    def scan_chunk(self, index, last_index):
+        data = self.tables[0].data
+        chunk = data[index:min(last_index + self.overlap, len(data))]
+        spans = [m.span() for m in self.regex.finditer(chunk) if m.start() < last_index - index and m.end() > m.start()]
+        spans = np.array(spans, dtype=np.intp).reshape(-1, 2) + index
+        return spans[:,0], spans[:,1]
+
+
+class DiffEngine(BackgroundScanner):
+    """Compares two HexTables, marking differing bytes in both with
+    diff_bit_mask.
+
+    The comparison is done with vectorized blocks of `chunk_size` bytes, so
+    memory mapped files are compared without reading them into memory all
+    at once. Differences are stored as runs in an IntervalIndex, which also
+    provides the jumps to the next and previous difference. Bytes past the
+    end of the shorter table count as different.
+    """
+    style_mask = diff_bit_mask
+
+    def __init__(self, table, other_table, callback=None):
+        BackgroundScanner.__init__(self, [table, other_table], callback)
+
+    @property
+    def scan_length(self):
+        return max(len(self.tables[0].data), len(self.tables[1].data))
+
+    def start(self):
+        self.start_scan()
+
+    def scan_chunk(self, index, last_index):
+        a = self.tables[0].data[index:last_index]
+        b = self.tables[1].data[index:last_index]
+        count = min(len(a), len(b))
+        diff = np.ones(last_index - index + 2, dtype=np.int8)
+        diff[0] = diff[-1] = 0
+        diff[1:count + 1] = np.not_equal(a[:count], b[:count])
+        edges = np.diff(diff)
+        starts = np.flatnonzero(edges == 1) + index
+        ends = np.flatnonzero(edges == -1) + index
+        return starts, ends
+
+
+class BlockStatistics(object):
+    """Per-block statistics of a table's data, used for overview displays.
+
+    For each block of `block_size` bytes, the entropy (normalized to 0-1),
+    the fraction of zero bytes and the fraction of printable ASCII are
+    computed on a worker thread. When complete, a pyramid of coarser
+    levels is built by averaging pairs of blocks, so any display size can
+    be served by sampling a level that is about as long as the display,
+    independent of the size of the data.
+    """
+    chunk_blocks = 256
+    stat_names = ["entropy", "zeros", "printable"]
+
+    def __init__(self, table, block_size=4096, callback=None):
+        self.table = table
+        self.block_size = block_size
+        self.callback = callback
+        num_blocks = max(1, (len(table.data) + block_size - 1) // block_size)
+        self.levels = [np.zeros((num_blocks, len(self.stat_names)), dtype=np.float32)]
+        self.num_computed = 0
+        self.is_complete = False
+        self.thread = None
+        self.cancel_event = threading.Event()
+
+    def start(self):
+        self.cancel()
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.scan, args=(self.cancel_event,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def cancel(self):
+        if self.thread is not None:
+            self.cancel_event.set()
+            self.thread.join()
+            self.thread = None
+
+    @classmethod
+    def calc_block_stats(cls, data, block_size):
+        """Return an array of shape (num_blocks, 3) of the statistics of each
+        block of data; the last block may be partial.
+        """
+        num_full = len(data) // block_size
+        hist = np.zeros(((len(data) + block_size - 1) // block_size, 256), dtype=np.intp)
+        if num_full:
+            full = np.asarray(data[0:num_full * block_size], dtype=np.intp).reshape(num_full, block_size)
+            full = full + (np.arange(num_full, dtype=np.intp) * 256)[:,np.newaxis]
+            hist[0:num_full] = np.bincount(full.ravel(), minlength=num_full * 256).reshape(num_full, 256)
+        if len(hist) > num_full:
+            hist[num_full] = np.bincount(np.asarray(data[num_full * block_size:], dtype=np.intp), minlength=256)
+        counts = hist.sum(axis=1)[:,np.newaxis].astype(np.float32)
+        p = hist / counts
+        logp = np.log2(p, out=np.zeros_like(p), where=p > 0)
+        stats = np.empty((len(hist), 3), dtype=np.float32)
+        stats[:,0] = -(p * logp).sum(axis=1) / 8.0
+        stats[:,1] = p[:,0]
+        stats[:,2] = p[:,32:127].sum(axis=1)
+        return stats
+
+    def scan(self, cancel_event):
+        data = self.table.data
+        level = self.levels[0]
+        chunk = self.chunk_blocks * self.block_size
+        for index in range(0, len(data), chunk):
+            if cancel_event.is_set():
+                return
+            first = index // self.block_size
+            stats = self.calc_block_stats(data[index:min(index + chunk, len(data))], self.block_size)
+            level[first:first + len(stats)] = stats
+            self.num_computed = first + len(stats)
+            if self.callback is not None:
+                wx.CallAfter(self.callback)
+        self.build_pyramid()
+        self.is_complete = True
+        if self.callback is not None:
+            wx.CallAfter(self.callback)
+
+    def build_pyramid(self):
+        levels = [self.levels[0]]
+        level = levels[0]
+        while len(level) > 1:
+            if len(level) % 2:
+                level = np.append(level, level[-1:], axis=0)
+            level = (level[0::2] + level[1::2]) / 2
+            levels.append(level)
+        self.levels = levels
+
+    def sample(self, num_samples):
+        """Statistics resampled to num_samples entries, using the coarsest
+        pyramid level that still has at least num_samples blocks.
+        """
+        levels = self.levels
+        level = levels[0]
+        for coarser in levels[1:]:
+            if len(coarser) < num_samples:
+                break
+            level = coarser
+        indexes = (np.arange(num_samples) * len(level)) // max(1, num_samples)
+        return level[indexes]
+
 
 class HexTable(object):
     def __init__(self, data, bytes_per_row, start_addr, col_widths=None, start_offset_mask=0):
-        self.data = data
+        self.data = EditOverlay(as_byte_array(data))
         self.start_addr = start_addr
         self.bytes_per_row = bytes_per_row
         if col_widths is None:
             col_widths = [1] * bytes_per_row
         self.items_per_row = len(col_widths)
         self.start_offset = start_addr & start_offset_mask if start_offset_mask else 0
-        self.num_rows = ((self.start_offset + len(self.data) - 1) / bytes_per_row) + 1
+        self.num_rows = ((self.start_offset + len(self.data) - 1) // bytes_per_row) + 1
         self.last_valid_index = len(self.data)
-        print((self.data, self.num_rows, self.start_offset, self.start_addr))
+        draw_log.debug("table: %d bytes, %d rows, start_offset=%d, start_addr=%x", len(self.data), self.num_rows, self.start_offset, self.start_addr)
         self.calc_cells(col_widths)
         self.calc_labels()
 
         self.default_renderer = None
-        self.hex_renderer = None
+        # views sharing the table may draw differently (e.g. a multi-cell
+        # view next to an atlas view), so hex renderers are kept per class
+        self.hex_renderers = {}
+        self.style_layers = {}
+
+    @classmethod
+    def from_file(cls, filename, bytes_per_row, start_addr=0, *args, **kwargs):
+        """Create a table backed by a read-only memory map of the file, so
+        only the pages needed to draw the visible rows are ever read.
+        """
+        if os.path.getsize(filename) == 0:
+            data = np.zeros(0, dtype=np.uint8)
+        else:
+            data = np.memmap(filename, dtype=np.uint8, mode="r")
+        return cls(data, bytes_per_row, start_addr, *args, **kwargs)
 
     def calc_cells(self, col_widths):
         """
@@ -854,27 +2291,63 @@ class HexTable(object):
             required to display that items in that column
         """
         self.col_widths = tuple(col_widths)  # copy to prevent possible weird errors if parent modifies list!
-        self.cell_to_col = []
-        self.col_to_cell = []
-        pos = 0
-        for i, width in enumerate(col_widths):
-            self.col_to_cell.append(pos)
-            self.cell_to_col.extend([i] * width)
-            pos += width
-        self.num_cells = pos
+
+        # prefix sum of the widths: col_to_cell[i] is the first cell of
+        # column i, and the extra entry at the end is the total cell count
+        self.col_to_cell = np.zeros(len(col_widths) + 1, dtype=np.intp)
+        np.cumsum(col_widths, out=self.col_to_cell[1:])
+        self.num_cells = int(self.col_to_cell[-1])
+
+    def get_col_of_cell(self, cell):
+        """Binary search for the column containing the cell, clamped to the
+        valid columns.
+        """
+        col = int(np.searchsorted(self.col_to_cell, cell, side="right")) - 1
+        return ForceBetween(0, col, self.items_per_row - 1)
+
+    def get_visible_cols(self, first_cell, num_cells):
+        """Return the range of columns (start, end exclusive) that
+        intersect num_cells cells starting at first_cell.
+        """
+        start_col = self.get_col_of_cell(first_cell)
+        end_col = self.get_col_of_cell(first_cell + num_cells - 1) + 1
+        return start_col, end_col
 
     def calc_labels(self):
         self.label_start_addr = int(self.start_addr // self.bytes_per_row) * self.bytes_per_row
         self.col_label_text = ["%x" % x for x in range(self.items_per_row)]
 
+    def set_style_layer(self, mask, layer):
+        """Add a source of style bits for the given bit mask, e.g.
+        match_bit_mask or comment_bit_mask. The layer may be a uint8 array
+        the same length as the data or any object that returns one when
+        sliced.
+        """
+        self.style_layers[mask] = layer
+
+    def clear_style_layer(self, mask):
+        self.style_layers.pop(mask, None)
+
+    def set_bytes(self, index, values):
+        return self.data.write(index, values)
+
+    def undo(self):
+        return self.data.undo()
+
+    def redo(self):
+        return self.data.redo()
+
     def create_renderer(self, col, settings_obj, view_obj):
         if not self.default_renderer:
             self.default_renderer = DrawTextImageCache(settings_obj, view_obj)
-        if not self.hex_renderer:
-            self.hex_renderer = HexByteImageCache(settings_obj, view_obj)
         if col is None:
             return self.default_renderer
-        return self.hex_renderer
+        cls = HexByteGlyphAtlas if view_obj.uses_glyph_atlas else HexByteImageCache
+        try:
+            return self.hex_renderers[cls]
+        except KeyError:
+            renderer = self.hex_renderers[cls] = cls(settings_obj, view_obj)
+            return renderer
 
     def enforce_valid_cursor(self, row, cell):
         if cell >= self.num_cells:
@@ -890,10 +2363,12 @@ class HexTable(object):
         for line in range(start_line, start_line + num_lines + 1):
             yield line, "%04x" % (self.get_index_of_row(line) + self.start_addr)
 
-    def get_col_labels(self, starting_cell):
-        starting_col = self.cell_to_col[starting_cell]
-        for col in range(starting_col, self.items_per_row):
-            yield self.col_to_cell[col], self.col_widths[col], self.col_label_text[col]
+    def get_col_labels(self, starting_cell, num_cells=None):
+        if num_cells is None:
+            num_cells = self.num_cells
+        starting_col, end_col = self.get_visible_cols(starting_cell, num_cells)
+        for col in range(starting_col, end_col):
+            yield int(self.col_to_cell[col]), self.col_widths[col], self.col_label_text[col]
 
     def get_index_range(self, row, col):
         """Get the byte offset from start of file given row, col
@@ -905,6 +2380,29 @@ class HexTable(object):
     def get_index_of_row(self, line):
         return (line * self.items_per_row) - self.start_offset
 
+    def get_block_ranges(self, row1, cell1, row2, cell2):
+        """Return the (starts, ends) index ranges of the rectangular block
+        of cells with the given corners: one range per row, clipped to the
+        valid data.
+        """
+        row1, row2 = min(row1, row2), max(row1, row2)
+        cell1, cell2 = min(cell1, cell2), max(cell1, cell2)
+        first, _ = self.get_index_range(row1, cell1)
+        _, last = self.get_index_range(row1, cell2)
+        stride = self.get_index_range(row1 + 1, cell1)[0] - first
+        starts = first + np.arange(row2 - row1 + 1, dtype=np.intp) * stride
+        ends = starts + (last - first)
+        np.clip(starts, 0, self.last_valid_index, out=starts)
+        np.clip(ends, 0, self.last_valid_index, out=ends)
+        valid = ends > starts
+        return starts[valid], ends[valid]
+
+    def get_row_of_index(self, index):
+        return (index + self.start_offset) // self.bytes_per_row
+
+    def get_row_cell_of_index(self, index):
+        return divmod(index + self.start_offset, self.bytes_per_row)
+
 
 class VariableWidthHexTable(HexTable):
     def get_index_range(self, row, cell):
@@ -912,9 +2410,16 @@ class VariableWidthHexTable(HexTable):
         position.
         """
         index = row * self.items_per_row
-        index += self.cell_to_col[cell]
+        index += self.get_col_of_cell(cell)
         return index, index + 1
 
+    def get_row_of_index(self, index):
+        return index // self.items_per_row
+
+    def get_row_cell_of_index(self, index):
+        row, col = divmod(index, self.items_per_row)
+        return row, int(self.col_to_cell[col])
+
 
 class FixedFontMixedMultiCellNumpyWindow(FixedFontMultiCellNumpyWindow):
         #             "0A 0X 0Y FF sv-bdizc  00 00 00 LDA $%04x"
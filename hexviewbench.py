@@ -0,0 +1,467 @@
+#!/usr/bin/env python
+"""Headless rendering benchmark for the hex view widgets.
+
+Builds a HexGridWindow around synthetic HexTables of various sizes, runs
+scripted scroll, zoom, select and edit sequences through the same paint
+path the UI uses, and writes per-frame paint times (broken down by the
+view's RenderStats), blit counts, cache sizes and peak RSS as JSON so
+render path regressions can be compared between runs:
+
+    python hexviewbench.py --sizes 1K,1M,1G,10G -o bench.json
+
+If there is no X display, an Xvfb server is started for the duration of
+the run. Tables larger than --max-memory are backed by a sparse temporary
+file that is memory mapped, so a 10G table costs no more than the pages
+that are actually drawn.
+
+Peak RSS is a lifetime maximum of a process, so each size and renderer is
+run in a fresh subprocess.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import platform
+import argparse
+import subprocess
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+import numpy as np
+import wx
+
+import hexview
+import hexviewscroller
+from hexview import ForceBetween
+
+
+size_suffixes = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text):
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in size_suffixes:
+        return int(float(text[:-1]) * size_suffixes[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for suffix in "TGMK":
+        scale = size_suffixes[suffix]
+        if size >= scale and size % scale == 0:
+            return "%d%s" % (size // scale, suffix)
+    return str(size)
+
+
+def start_xvfb(width=1280, height=1024):
+    """Start an Xvfb server if there's no display; returns the process so
+    it can be shut down after the run, or None if one wasn't needed.
+    """
+    if os.environ.get("DISPLAY") or sys.platform in ("darwin", "win32"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        sys.exit("No DISPLAY and Xvfb not found; install Xvfb or run under xvfb-run")
+    for num in range(99, 199):
+        if not os.path.exists("/tmp/.X%d-lock" % num):
+            break
+    proc = subprocess.Popen([xvfb, ":%d" % num, "-screen", "0", "%dx%dx24" % (width, height), "-nolisten", "tcp"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket = "/tmp/.X11-unix/X%d" % num
+    for i in range(100):
+        if os.path.exists(socket):
+            break
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = ":%d" % num
+    return proc
+
+
+def get_peak_rss_kb():
+    if resource is None:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) // 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024  # reported in bytes on mac
+    return peak
+
+
+class SyntheticData(object):
+    """Data for a benchmark table: a repeating pattern with runs of zeros,
+    ASCII text and random bytes so that every style of rendering is
+    exercised. Large sizes are written as a sparse file and memory mapped.
+    """
+    pattern_size = 64 * 1024
+
+    def __init__(self, size, max_memory):
+        self.size = size
+        self.filename = None
+        rng = np.random.RandomState(size & 0xffffffff)
+        pattern = rng.randint(0, 256, self.pattern_size).astype(np.uint8)
+        pattern[0:4096] = 0
+        pattern[8192:12288] = np.frombuffer((b"The quick brown fox jumps over the lazy dog. " * 100)[:4096], dtype=np.uint8)
+        self.pattern = pattern
+        if size <= max_memory:
+            self.array = np.resize(pattern, size)
+        else:
+            self.array = None
+            self.write_sparse_file()
+
+    def write_sparse_file(self):
+        fd, self.filename = tempfile.mkstemp(prefix="hexviewbench-", suffix=".bin")
+        with os.fdopen(fd, "wb") as fh:
+            fh.truncate(self.size)
+            # real data at the start, middle and end; everything else is
+            # a hole that reads as zeros
+            for offset in (0, self.size // 2, max(0, self.size - self.pattern_size)):
+                fh.seek(offset)
+                fh.write(self.pattern[:self.size - offset].tobytes())
+
+    def create_table(self, bytes_per_row=16):
+        if self.array is not None:
+            return hexview.HexTable(self.array, bytes_per_row, 0)
+        return hexview.HexTable.from_file(self.filename, bytes_per_row, 0)
+
+    def cleanup(self):
+        if self.filename is not None:
+            os.unlink(self.filename)
+            self.filename = None
+
+
+class BlitCounter(object):
+    """Counts the DrawBitmap calls made by a renderer by wrapping the
+    methods that each make exactly one.
+    """
+    # name -> whether the method returns the bitmap to draw, in which case
+    # a None result (nothing to draw) isn't counted
+    counted_methods = {"compose_glyphs": True, "draw_cached_text": False}
+
+    def __init__(self):
+        self.count = 0
+
+    def attach(self, renderer):
+        if renderer is None or getattr(renderer, "_bench_counted", False):
+            return
+        for name, returns_bitmap in self.counted_methods.items():
+            method = getattr(renderer, name, None)
+            if method is not None:
+                setattr(renderer, name, self.wrap(method, returns_bitmap))
+        renderer._bench_counted = True
+
+    def wrap(self, method, returns_bitmap):
+        def counted(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if result is not None or not returns_bitmap:
+                self.count += 1
+            return result
+        return counted
+
+
+class Scenario(object):
+    """A scripted sequence of frames. Each step changes the state of the
+    view and is followed by a timed paint through the grid's scroll
+    sync.
+    """
+    name = None
+    num_frames = 100
+
+    def __init__(self, grid, rng):
+        self.grid = grid
+        self.main = grid.main
+        self.rng = rng
+
+    def setup(self):
+        m = self.main
+        m.sy = m.sx = m.cy = m.cx = 0
+        m.pixel_offset_y = 0
+        m.SelectOff()
+        m.invalidate_all()
+
+    def step(self, frame):
+        raise NotImplementedError
+
+    def scroll_to_row(self, row):
+        m = self.main
+        m.sy = row
+        m.VertBoundaries()
+        m.cy = ForceBetween(m.sy, m.cy, m.sy + m.sh - 1)
+
+
+class ScrollLines(Scenario):
+    name = "scroll_lines"
+
+    def step(self, frame):
+        self.scroll_to_row(self.main.sy + 1)
+
+
+class ScrollPages(Scenario):
+    name = "scroll_pages"
+
+    def step(self, frame):
+        self.scroll_to_row(self.main.sy + self.main.sh)
+
+
+class ScrollRandom(Scenario):
+    name = "scroll_random"
+
+    def step(self, frame):
+        self.scroll_to_row(self.rng.randrange(max(1, self.main.table.num_rows)))
+
+
+class ScrollPixels(Scenario):
+    name = "scroll_pixels"
+
+    def step(self, frame):
+        m = self.main
+        m.pixel_offset_y += 3
+        if m.pixel_offset_y >= m.cell_height_in_pixels:
+            m.pixel_offset_y -= m.cell_height_in_pixels
+            m.sy += 1
+
+
+class Zoom(Scenario):
+    name = "zoom"
+    num_frames = 20
+
+    def step(self, frame):
+        if (frame // 4) % 2:
+            self.main.zoom_out()
+        else:
+            self.main.zoom_in()
+
+
+class DragSelect(Scenario):
+    name = "select"
+
+    def setup(self):
+        Scenario.setup(self)
+        self.main.start_selection()
+        self.main.Selecting = True
+
+    def step(self, frame):
+        m = self.main
+        m.cx = (m.cx + 5) % m.table.num_cells
+        if m.cx < 5:
+            m.cy = min(m.cy + 1, m.table.num_rows - 1)
+        m.cx = m.table.enforce_valid_cursor(m.cy, m.cx)
+        m.update_selection()
+
+
+class Edit(Scenario):
+    name = "edit"
+
+    def step(self, frame):
+        m = self.main
+        t = m.table
+        first, _ = t.get_index_range(m.sy, 0)
+        last = min(len(t.data), first + m.sh * t.bytes_per_row)
+        if last > first:
+            index = self.rng.randrange(first, last)
+            m.set_bytes(index, np.array([self.rng.randrange(256)], dtype=np.uint8))
+
+
+scenario_classes = [ScrollLines, ScrollPages, ScrollRandom, ScrollPixels, Zoom, DragSelect, Edit]
+
+
+def summarize_frames(times):
+    times = np.asarray(times) * 1000.0
+    if len(times) == 0:
+        return {"count": 0}
+    return {
+        "count": len(times),
+        "total_ms": float(times.sum()),
+        "mean_ms": float(times.mean()),
+        "median_ms": float(np.median(times)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "max_ms": float(times.max()),
+    }
+
+
+def summarize_render_stats(frame_stats):
+    """Totals of the per-frame RenderStats of a scenario"""
+    keys = ["rows", "cells", "cache_hits", "cache_misses", "style_ms", "compose_ms", "blit_ms", "other_ms", "dropped_frames"]
+    totals = dict((k, 0) for k in keys)
+    for stats in frame_stats:
+        for k in keys:
+            totals[k] += stats[k]
+    totals["full_redraws"] = sum([1 for stats in frame_stats if stats["full_redraw"]])
+    return totals
+
+
+def get_cache_stats(view):
+    stats = {}
+    for name, renderer in [("default_renderer", view.table.default_renderer), ("hex_renderer", view.text_renderer)]:
+        if renderer is None:
+            continue
+        info = renderer.cache.get_stats()
+        atlases = getattr(renderer, "atlases", {})
+        info["atlases"] = len(atlases)
+        info["atlas_bytes"] = sum([int(a.nbytes) for a in atlases.values()])
+        stats[name] = info
+    return stats
+
+
+def run_scenario(app, grid, scenario, blits, keep_frames):
+    scenario.setup()
+    grid.main.UpdateView()
+    scheduler = grid.scroll_sync
+    blits.count = 0
+    times = []
+    frame_stats = []
+    render_stats = grid.main.render_stats
+    render_stats.add_listener(frame_stats.append)
+    try:
+        for frame in range(scenario.num_frames):
+            scenario.step(frame)
+            grid.schedule_paint("scroll")
+            start = time.perf_counter()
+            scheduler.flush()
+            times.append(time.perf_counter() - start)
+            app.Yield(True)
+    finally:
+        render_stats.remove_listener(frame_stats.append)
+    result = {
+        "scenario": scenario.name,
+        "frames": summarize_frames(times),
+        "render": summarize_render_stats(frame_stats),
+        "blits": blits.count,
+        "blits_per_frame": blits.count / float(max(1, len(times))),
+        "caches": get_cache_stats(grid.main),
+        "peak_rss_kb": get_peak_rss_kb(),
+    }
+    if keep_frames:
+        result["frame_ms"] = [t * 1000.0 for t in times]
+    return result
+
+
+def run(args):
+    app = wx.App(False)
+    frame = wx.Frame(None, -1, "hexviewbench")
+    frame.SetClientSize((args.width, args.height))
+    results = []
+    for size_text in args.sizes.split(","):
+        size = parse_size(size_text)
+        data = SyntheticData(size, parse_size(args.max_memory))
+        try:
+            for use_glyph_atlas in args.renderers:
+                table = data.create_table()
+                grid = hexviewscroller.HexGridWindow(hexview.FixedFontNumpyWindow, table, frame)
+                grid.smooth_scroller.stop()
+                # the overview's statistics would scan the whole table in
+                # the background, competing for the GIL and page cache
+                grid.overview.stats.cancel()
+                if grid.use_glyph_atlas != use_glyph_atlas:
+                    grid.use_glyph_atlas = use_glyph_atlas
+                    # the atlas of the previous renderer would otherwise
+                    # keep building during every Yield
+                    grid.main.cancel_prebuild()
+                    grid.main.init_renderers()
+                frame.SetSizer(None)
+                sizer = wx.BoxSizer(wx.VERTICAL)
+                sizer.Add(grid, 1, wx.EXPAND)
+                frame.SetSizer(sizer)
+                frame.Show()
+                frame.Layout()
+                app.Yield(True)
+                blits = BlitCounter()
+                blits.attach(table.default_renderer)
+                blits.attach(grid.main.text_renderer)
+                rng = random.Random(args.seed)
+                for cls in scenario_classes:
+                    if args.scenarios and cls.name not in args.scenarios:
+                        continue
+                    scenario = cls(grid, rng)
+                    if args.frames:
+                        scenario.num_frames = args.frames
+                    result = run_scenario(app, grid, scenario, blits, args.keep_frames)
+                    result["size"] = size
+                    result["size_text"] = format_size(size)
+                    result["renderer"] = "glyph_atlas" if use_glyph_atlas else "bitmap_cache"
+                    result["scheduler"] = grid.scroll_sync.get_stats()
+                    results.append(result)
+                    f = result["frames"]
+                    print("%-6s %-12s %-14s %5d frames  mean %7.2f ms  p95 %7.2f ms  %7.1f blits/frame" % (result["size_text"], result["renderer"], scenario.name, f["count"], f.get("mean_ms", 0), f.get("p95_ms", 0), result["blits_per_frame"]))
+                frame.SetSizer(None)
+                grid.Destroy()
+                app.Yield(True)
+        finally:
+            data.cleanup()
+    frame.Destroy()
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "wx": wx.VERSION_STRING,
+            "platform": platform.platform(),
+            "display": os.environ.get("DISPLAY"),
+            "window_size": [args.width, args.height],
+        },
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def run_in_subprocess(args, size_text, use_glyph_atlas):
+    params = dict(vars(args), sizes=size_text, renderers=[use_glyph_atlas])
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(1)
+    try:
+        return pool.apply(run, (argparse.Namespace(**params),))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rendering of the hex view widgets")
+    parser.add_argument("-o", "--output", default="hexviewbench.json", help="JSON file for the results; '-' for stdout")
+    parser.add_argument("--sizes", default="1K,1M,100M,10G", help="comma separated table sizes, e.g. 1K,1M,10G")
+    parser.add_argument("--scenarios", nargs="*", help="only run these scenarios: %s" % ", ".join(c.name for c in scenario_classes))
+    parser.add_argument("--frames", type=int, default=0, help="override the number of frames in each scenario")
+    parser.add_argument("--renderer", choices=["atlas", "cache", "both"], default="both", help="hex byte renderer(s) to benchmark")
+    parser.add_argument("--max-memory", default="256M", help="larger tables are memory mapped from a sparse file")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-frames", action="store_true", help="include every frame time in the output")
+    args = parser.parse_args()
+    args.renderers = {"atlas": [True], "cache": [False], "both": [True, False]}[args.renderer]
+
+    xvfb = start_xvfb(args.width + 256, args.height + 256)
+    try:
+        report = None
+        for size_text in args.sizes.split(","):
+            for use_glyph_atlas in args.renderers:
+                r = run_in_subprocess(args, size_text, use_glyph_atlas)
+                if report is None:
+                    report = r
+                else:
+                    report["results"].extend(r["results"])
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as fh:
+            fh.write(text)
+            fh.write("\n")
+        print("wrote %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
+import sys
 import time
 
 import wx
 import numpy as np
 
 import hexview
+from hexview import ForceBetween
+from scrollsync import ScrollSync
 
 # Check wxpython demo for Editor to see a pure-python implementation of an on-
 # demand renderer for lines of text: wx.lib.editor
@@ -21,6 +24,13 @@ class AuxWindow(wx.ScrolledWindow):
         self.EnableScrolling(False, False)
         self.ShowScrollbars(wx.SHOW_SB_NEVER, wx.SHOW_SB_NEVER)
 
+        # Labels are kept in a backing store that is only re-rendered when
+        # the labels change; scrolling shifts the existing labels and only
+        # renders the ones that have just come into view.
+        self.backing_store = None
+        self.scroll_buffer = None
+        self.drawn_label_state = None
+
         self.Bind(wx.EVT_PAINT, self.OnPaint)
         self.Bind(wx.EVT_SIZE, self.OnSize)
         self.Bind(wx.EVT_ERASE_BACKGROUND, self.OnEraseBackground)
@@ -47,31 +57,138 @@ class AuxWindow(wx.ScrolledWindow):
     def OnEraseBackground(self, evt):
         pass
 
+    def invalidate(self):
+        self.backing_store = None
+        self.drawn_label_state = None
 
-class LeftAuxWindow(AuxWindow):
-    def DrawVertText(self, t, line, dc):
-        s = self.scroll_source
-        y = (line - s.sy) * s.cell_height_in_pixels
-        dc.DrawText(t, 0, y)
+    def get_label_state(self):
+        """Tuple describing the labels shown; the first element is the
+        scroll position along the label axis, the rest must match for the
+        existing labels to be reused.
+        """
+        raise NotImplementedError
+
+    def get_label_background(self):
+        raise NotImplementedError
+
+    def shift_backing_store(self, dx, dy):
+        w, h = self.backing_store.GetSize()
+        if self.scroll_buffer is None or self.scroll_buffer.GetSize() != (w, h):
+            self.scroll_buffer = wx.Bitmap(w, h)
+        src = wx.MemoryDC(self.backing_store)
+        dest = wx.MemoryDC(self.scroll_buffer)
+        dest.SetBackground(wx.Brush(self.get_label_background()))
+        dest.Clear()
+        dest.Blit(max(0, -dx), max(0, -dy), w - abs(dx), h - abs(dy), src, max(0, dx), max(0, dy))
+        del src, dest
+        self.backing_store, self.scroll_buffer = self.scroll_buffer, self.backing_store
+
+    def prepare_backing_store(self):
+        """Returns the scroll delta along the label axis since the last
+        draw, or None if all labels must be rendered.
+        """
+        w, h = self.GetClientSize()
+        w, h = max(w, 1), max(h, 1) + self.scroll_source.cell_height_in_pixels
+        full = False
+        if self.backing_store is None or self.backing_store.GetSize() != (w, h):
+            self.backing_store = wx.Bitmap(w, h)
+            full = True
+        state = self.get_label_state()
+        old_state = self.drawn_label_state
+        self.drawn_label_state = state
+        if full or old_state is None or state[1:] != old_state[1:]:
+            return None
+        return state[0] - old_state[0]
 
     def Draw(self, odc=None):
         if not odc:
             odc = wx.ClientDC(self)
 
-        dc = wx.BufferedDC(odc)
+        delta = self.prepare_backing_store()
+        if delta:
+            if self.can_shift_labels(delta):
+                self.shift_backing_store(*self.get_shift_pixels(delta))
+            else:
+                delta = None
+        dc = wx.MemoryDC(self.backing_store)
         s = self.scroll_source
         if dc.IsOk():
-            dc.SetFont(s.settings_obj.header_font)
+            dc.SetFont(s.settings_obj.label_font)
             dc.SetBackgroundMode(wx.SOLID)
-            dc.SetTextBackground(s.settings_obj.row_header_bg_color)
+            dc.SetTextBackground(self.get_label_background())
             dc.SetTextForeground(s.settings_obj.text_color)
-            dc.SetBackground(wx.Brush(s.settings_obj.row_header_bg_color))
-            dc.Clear()
-            for line, header in self.scroll_source.table.get_row_label_text(s.sy, s.sh):
-                if s.IsLine(line):
-                    self.DrawVertText(header, line, dc)
+            dc.SetBackground(wx.Brush(self.get_label_background()))
+            if delta is None:
+                dc.Clear()
+                self.DrawAllLabels(dc)
+            elif delta != 0:
+                self.DrawExposedLabels(delta, dc)
+            w, h = self.GetClientSize()
+            odc.Blit(0, 0, w, h, dc, 0, self.get_pixel_offset())
+
+    def get_pixel_offset(self):
+        return 0
+
+    def ClearStrip(self, x, y, w, h, dc):
+        dc.SetBrush(wx.Brush(self.get_label_background()))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.DrawRectangle(x, y, w, h)
+
+
+class LeftAuxWindow(AuxWindow):
+    def get_label_state(self):
+        s = self.scroll_source
+        return (s.sy, s.sh, s.cell_height_in_pixels, s.fw, s.table)
+
+    def get_label_background(self):
+        return self.scroll_source.settings_obj.row_header_bg_color
+
+    def get_pixel_offset(self):
+        return self.scroll_source.pixel_offset_y
+
+    def DrawVertText(self, t, line, dc):
+        s = self.scroll_source
+        y = (line - s.sy) * s.cell_height_in_pixels
+        dc.DrawText(t, 0, y)
+
+    def DrawLabels(self, start_line, num_lines, dc):
+        s = self.scroll_source
+        for line, header in s.table.get_row_label_text(start_line, num_lines - 1):
+            if s.IsLine(line):
+                self.DrawVertText(header, line, dc)
+
+    def DrawAllLabels(self, dc):
+        s = self.scroll_source
+        self.DrawLabels(s.sy, s.num_drawn_rows, dc)
+
+    def can_shift_labels(self, num_rows):
+        return abs(num_rows) <= self.scroll_source.sh
+
+    def get_shift_pixels(self, num_rows):
+        return 0, num_rows * self.scroll_source.cell_height_in_pixels
+
+    def DrawExposedLabels(self, num_rows, dc):
+        s = self.scroll_source
+        w, h = self.backing_store.GetSize()
+        if num_rows > 0:
+            line = s.sy + s.num_drawn_rows - num_rows
+        else:
+            line = s.sy
+        # the exposed strip was cleared by the shift, but labels pushed
+        # below the last row would be left partially visible
+        bottom = s.num_drawn_rows * s.cell_height_in_pixels
+        self.ClearStrip(0, bottom, w, h - bottom, dc)
+        self.DrawLabels(line, abs(num_rows), dc)
+
 
 class TopAuxWindow(AuxWindow):
+    def get_label_state(self):
+        s = self.scroll_source
+        return (s.sx, s.sw, s.cell_width_in_pixels, s.fw, s.table)
+
+    def get_label_background(self):
+        return self.scroll_source.settings_obj.col_header_bg_color
+
     def DrawHorzText(self, t, sx, num_cells, dc):
         s = self.scroll_source
         x = (sx - s.sx) * s.cell_width_in_pixels
@@ -79,21 +196,231 @@ class TopAuxWindow(AuxWindow):
         offset = ((s.cell_width_in_pixels * num_cells) - width)/2  # center text in cell
         dc.DrawText(t, x + offset, 0)
 
-    def Draw(self, odc=None):
-        if not odc:
-            odc = wx.ClientDC(self)
+    def DrawLabels(self, start_cell, num_cells, dc):
+        s = self.scroll_source
+        for cell, num_cells, header in s.table.get_col_labels(start_cell, num_cells):
+            self.DrawHorzText(header, cell, num_cells, dc)
 
-        dc = wx.BufferedDC(odc)
+    def DrawAllLabels(self, dc):
         s = self.scroll_source
-        if dc.IsOk():
-            dc.SetFont(s.settings_obj.header_font)
-            dc.SetBackgroundMode(wx.SOLID)
-            dc.SetTextBackground(s.settings_obj.col_header_bg_color)
-            dc.SetTextForeground(s.settings_obj.text_color)
-            dc.SetBackground(wx.Brush(s.settings_obj.col_header_bg_color))
-            dc.Clear()
-            for cell, num_cells, header in self.scroll_source.table.get_col_labels(s.sx):
-                self.DrawHorzText(header, cell, num_cells, dc)
+        self.DrawLabels(s.sx, s.sw + 2, dc)
+
+    def can_shift_labels(self, num_cells):
+        return abs(num_cells) <= self.scroll_source.sw
+
+    def get_shift_pixels(self, num_cells):
+        return num_cells * self.scroll_source.cell_width_in_pixels, 0
+
+    def DrawExposedLabels(self, num_cells, dc):
+        s = self.scroll_source
+        w, h = self.backing_store.GetSize()
+        if num_cells > 0:
+            x = w - num_cells * s.cell_width_in_pixels
+            cell = s.sx + x // s.cell_width_in_pixels
+            count = s.sw + 2 - x // s.cell_width_in_pixels
+        else:
+            x = 0
+            cell = s.sx
+            count = -num_cells
+        # labels of wide columns may straddle the exposed strip; clipping
+        # keeps them from overdrawing the part that was shifted into place
+        dc.SetClippingRegion(x, 0, w - x if num_cells > 0 else count * s.cell_width_in_pixels, h)
+        self.DrawLabels(cell, count, dc)
+        dc.DestroyClippingRegion()
+
+
+class OverviewWindow(wx.Window):
+    """Minimap of the whole table showing per-block statistics as a color
+    strip: red is entropy, green is zero bytes and blue is printable ASCII.
+
+    The statistics are computed in the background by
+    hexview.BlockStatistics; painting samples its pyramid at the window's
+    height, so the cost doesn't depend on the size of the data. Clicking or
+    dragging moves the main view to the corresponding location.
+    """
+    def __init__(self, parent, scroll_source, width=24):
+        wx.Window.__init__(self, parent, -1, size=(width, -1))
+        self.SetMinSize((width, -1))
+        self.scroll_source = scroll_source
+        self.stats = None
+        self.last_refresh_time = 0
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_ERASE_BACKGROUND, lambda evt: False)
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_left_down)
+        self.Bind(wx.EVT_MOTION, self.on_motion)
+        self.Bind(wx.EVT_LEFT_UP, self.on_left_up)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+        self.set_table(scroll_source.table)
+
+    def set_table(self, table):
+        if self.stats is not None:
+            self.stats.cancel()
+        self.stats = hexview.BlockStatistics(table, callback=self.on_stats_progress)
+        self.stats.start()
+
+    def on_stats_progress(self):
+        # progress arrives once per chunk; limit repaints to a few a second
+        if self and (self.stats.is_complete or time.time() - self.last_refresh_time > 0.2):
+            self.last_refresh_time = time.time()
+            self.Refresh()
+
+    def on_destroy(self, event):
+        self.stats.cancel()
+        event.Skip()
+
+    def on_size(self, event):
+        self.Refresh()
+
+    def on_paint(self, event):
+        dc = wx.PaintDC(self)
+        w, h = self.GetClientSize()
+        if w <= 0 or h <= 0:
+            return
+        colors = (self.stats.sample(h) * 255).clip(0, 255).astype(np.uint8)
+        pixels = np.ascontiguousarray(np.repeat(colors[:,np.newaxis,:], w, axis=1))
+        dc.DrawBitmap(wx.Bitmap.FromBuffer(w, h, pixels), 0, 0)
+
+        s = self.scroll_source
+        num_rows = max(1, s.table.num_rows)
+        y = s.sy * h // num_rows
+        height = max(2, (s.sh + 1) * h // num_rows)
+        dc.SetBrush(wx.TRANSPARENT_BRUSH)
+        dc.SetPen(wx.Pen(wx.WHITE, 1, wx.SOLID))
+        dc.DrawRectangle(0, y, w, height)
+
+    def jump_to(self, y):
+        s = self.scroll_source
+        # a running kinetic scroll would otherwise snap the view back
+        s.parent_scrolled_window.smooth_scroller.stop()
+        w, h = self.GetClientSize()
+        row = int(ForceBetween(0, y, h) * s.table.num_rows // max(1, h))
+        s.sy = row - s.sh // 2
+        s.pixel_offset_y = 0
+        s.VertBoundaries()
+        s.parent_scrolled_window.schedule_paint("scroll")
+
+    def on_left_down(self, event):
+        self.CaptureMouse()
+        self.jump_to(event.GetY())
+
+    def on_motion(self, event):
+        if event.LeftIsDown() and self.HasCapture():
+            self.jump_to(event.GetY())
+
+    def on_left_up(self, event):
+        if self.HasCapture():
+            self.ReleaseMouse()
+
+
+class SmoothScroller(object):
+    """Pixel-smooth, kinetic vertical scrolling for a HexGridWindow.
+
+    Wheel events add to a scroll velocity instead of jumping by rows; quick
+    successive wheel clicks accelerate. An animation timer moves the
+    view by sub-row pixel offsets and decays the velocity so the motion
+    coasts to a stop. Moving within a row is just a shifted blit of the
+    main window's backing store; crossing a row boundary renders only the
+    newly exposed row.
+    """
+    frame_interval = 16  # milliseconds
+    wheel_step = 3  # rows per wheel click at rest
+    acceleration_time = 0.15  # seconds between clicks to count as a spin
+    max_acceleration = 8.0
+    friction = 4.0  # velocity decay rate, per second
+    min_velocity = 20.0  # pixels per second
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.velocity = 0.0
+        self.position = 0.0
+        self.acceleration = 1.0
+        self.last_wheel_time = 0
+        self.last_frame_time = 0
+        self.timer = wx.Timer(grid)
+        grid.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+
+    @property
+    def is_running(self):
+        return self.timer.IsRunning()
+
+    def get_max_position(self):
+        main = self.grid.main
+        max_row = max(0, main.table.num_rows - main.sh + 1)
+        return max_row * main.cell_height_in_pixels
+
+    def on_wheel(self, rotation):
+        main = self.grid.main
+        now = time.time()
+        if now - self.last_wheel_time < self.acceleration_time:
+            self.acceleration = min(self.acceleration * 1.5, self.max_acceleration)
+        else:
+            self.acceleration = 1.0
+        self.last_wheel_time = now
+        if not self.is_running:
+            self.position = float(main.sy * main.cell_height_in_pixels + main.pixel_offset_y)
+            self.velocity = 0.0
+        direction = -1 if rotation > 0 else 1
+        # impulse chosen so the coasting distance is about wheel_step rows
+        distance = self.wheel_step * main.cell_height_in_pixels * self.acceleration
+        self.velocity += direction * distance * self.friction
+        if not self.is_running:
+            self.last_frame_time = now
+            self.timer.Start(self.frame_interval)
+
+    def stop(self):
+        self.timer.Stop()
+        self.velocity = 0.0
+
+    def on_timer(self, event):
+        now = time.time()
+        dt = now - self.last_frame_time
+        self.last_frame_time = now
+        self.position += self.velocity * dt
+        self.velocity *= max(0.0, 1.0 - self.friction * dt)
+        max_position = self.get_max_position()
+        if self.position <= 0 or self.position >= max_position:
+            self.position = ForceBetween(0, self.position, max_position)
+            self.velocity = 0.0
+        if abs(self.velocity) < self.min_velocity:
+            self.stop()
+        self.move_to(int(self.position))
+
+    def move_to(self, pixel_y):
+        main = self.grid.main
+        main.sy, main.pixel_offset_y = divmod(pixel_y, main.cell_height_in_pixels)
+        # coalesced with any other repaints of the same frame
+        self.grid.schedule_paint("scroll")
+
+
+class RenderStatsHUD(object):
+    """RenderStats listener that overlays the statistics of the last frame
+    on the main window of a HexGridWindow, with the frame times averaged
+    over the last `num_samples` frames.
+    """
+    num_samples = 30
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.frame_times = []
+
+    def __call__(self, stats):
+        main = self.grid.main
+        self.frame_times = self.frame_times[-(self.num_samples - 1):] + [stats["frame_ms"]]
+        text = "%.1f ms (avg %.1f)  rows %d  cells %d  hits %d  misses %d  style %.1f  compose %.1f  blit %.1f ms  dropped %d" % (
+            stats["frame_ms"], sum(self.frame_times) / len(self.frame_times),
+            stats["rows"], stats["cells"], stats["cache_hits"], stats["cache_misses"],
+            stats["style_ms"], stats["compose_ms"], stats["blit_ms"], stats["dropped_frames"])
+        # drawn directly on the window after the frame's blit, so it's
+        # replaced by the next frame rather than kept in the backing store
+        dc = wx.ClientDC(main)
+        dc.SetFont(self.grid.header_font)
+        w, h = dc.GetTextExtent(text)
+        dc.SetBrush(wx.Brush(wx.Colour(0, 0, 0)))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.DrawRectangle(0, 0, w + 8, h + 4)
+        dc.SetTextForeground(wx.Colour(255, 255, 0))
+        dc.DrawText(text, 4, 2)
 
 
 class TableViewParams(object):
@@ -124,20 +451,37 @@ class HexGridWindow(wx.ScrolledWindow):
         self.diff_text_color = (255, 0, 0)
         self.cursor_pen = wx.Pen(self.unfocused_cursor_color, 1, wx.SOLID)
         self.scroll_delay = 30  # milliseconds
+        self.use_glyph_atlas = True
+        self.zoom_font_sizes = None  # use hexview.ZoomLadder.default_sizes
+        self.bitmap_cache_bytes = 16 * 1024 * 1024
 
         self.text_font = self.NiceFontForPlatform()
         self.header_font = wx.Font(self.text_font).MakeBold()
+        self.label_font = self.header_font  # follows the main view's zoom
 
         self.update_dependents = self.update_dependents_null
+        # the main view owns the scroll position and repaints the header
+        # panes along with itself, so the grid is the only subscriber; the
+        # bus coalesces scrolls and repaint requests to one frame, and
+        # skips the frame when a scroll didn't move the viewport
+        self.scroll_sync = ScrollSync()
+        self.scroll_sync.register(self)
+        self.smooth_scroller = SmoothScroller(self)
+        self.smooth_scrolling = True
+        self.render_stats_hud = None
+        self.compared_views = []
         self.view_params = TableViewParams()
         self.main = grid_cls(self, self, table, self.view_params)
         self.top = TopAuxWindow(self, self.main)
         self.left = LeftAuxWindow(self, self.main)
-        sizer = wx.FlexGridSizer(2,2,0,0)
+        self.overview = OverviewWindow(self, self.main)
+        sizer = wx.FlexGridSizer(2,3,0,0)
         self.corner = sizer.Add(5, 5, 0, wx.EXPAND)
         sizer.Add(self.top, 0, wx.EXPAND)
+        sizer.Add(5, 5, 0, wx.EXPAND)
         sizer.Add(self.left, 0, wx.EXPAND)
         sizer.Add(self.main, 0, wx.EXPAND)
+        sizer.Add(self.overview, 0, wx.EXPAND)
         sizer.AddGrowableCol(1)
         sizer.AddGrowableRow(1)
         self.SetSizer(sizer)
@@ -148,6 +492,7 @@ class HexGridWindow(wx.ScrolledWindow):
         self.Bind(wx.EVT_MOUSEWHEEL, self.on_mouse_wheel)
         self.Bind(wx.EVT_SCROLLWIN, self.on_scroll_window)
         self.Bind(wx.EVT_LEFT_UP, self.on_left_up)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
 
         self.ShowScrollbars(wx.SHOW_SB_ALWAYS, wx.SHOW_SB_ALWAYS)
         self.main.ShowScrollbars(wx.SHOW_SB_NEVER, wx.SHOW_SB_NEVER)
@@ -193,6 +538,8 @@ class HexGridWindow(wx.ScrolledWindow):
         #(wl, hl) = self.left.GetSize()
         self.left.SetVirtualSize(wx.Size(left_width, height))
         self.corner.SetMinSize(left_width, top_height)
+        self.top.SetMinSize(wx.Size(-1, top_height))
+        self.left.SetMinSize(wx.Size(left_width, -1))
         #self.Layout()
         wx.CallAfter(self.main.SetScrollManager, self)
 
@@ -245,36 +592,136 @@ class HexGridWindow(wx.ScrolledWindow):
         self.main.VertBoundaries()
 
     def on_scroll_window(self, event):
+        self.smooth_scroller.stop()
+        self.main.pixel_offset_y = 0
+        caret = (self.main.cx, self.main.cy)
         dir = event.GetOrientation()
         eventType = event.GetEventType()
         if dir == wx.HORIZONTAL:
             self.HorizScroll(event, eventType)
         else:
             self.VertScroll(event, eventType)
-        self.main.UpdateView()
+        self.schedule_paint("scroll")
+        if caret != (self.main.cx, self.main.cy):
+            # scrolling to either end also moves the caret
+            self.schedule_paint("caret")
 
     def on_mouse_wheel(self, evt):
         w = evt.GetWheelRotation()
         if evt.ControlDown():
+            self.smooth_scroller.stop()
             if w < 0:
                 self.main.zoom_out()
             elif w > 0:
                 self.main.zoom_in()
         elif not evt.ShiftDown() and not evt.AltDown():
-            self.VertScroll(w, wx.wxEVT_MOUSEWHEEL)
-            self.main.UpdateView()
+            if self.smooth_scrolling:
+                self.smooth_scroller.on_wheel(w)
+            else:
+                self.VertScroll(w, wx.wxEVT_MOUSEWHEEL)
+                self.schedule_paint("scroll")
         else:
             evt.Skip()
 
+    def on_destroy(self, event):
+        if event.GetEventObject() is self:
+            self.scroll_sync.unregister(self)
+        event.Skip()
+
+    def schedule_paint(self, reason):
+        if reason == "scroll":
+            self.scroll_sync.scroll_to(*self.get_scroll_position())
+        else:
+            self.scroll_sync.request(reason)
+
+    def get_scroll_position(self):
+        """The main view's scroll position as seen by the scroll sync: the
+        horizontal position is in cells, the vertical one in pixels to
+        include the smooth scroll offset.
+        """
+        m = self.main
+        return m.sx, m.sy * m.cell_height_in_pixels + m.pixel_offset_y
+
+    def on_viewport_changed(self, x, y, dx, dy):
+        self.main.UpdateView()
+
+    def on_zoom_changed(self):
+        """Resize the header panes to the main view's new cell metrics"""
+        self.label_font = wx.Font(self.main.font).MakeBold()
+        w, h = self.main.GetVirtualSize()
+        self.set_pane_sizes(w, h)
+        self.top.invalidate()
+        self.left.invalidate()
+        self.Layout()
+
+    def show_render_stats(self, state=True):
+        """Toggle the overlay showing the statistics of each frame"""
+        stats = self.main.render_stats
+        if state and self.render_stats_hud is None:
+            self.render_stats_hud = RenderStatsHUD(self)
+            stats.add_listener(self.render_stats_hud)
+        elif not state and self.render_stats_hud is not None:
+            stats.remove_listener(self.render_stats_hud)
+            self.render_stats_hud = None
+        self.main.invalidate_all()
+        self.schedule_paint("render stats")
+
     def update_dependents_null(self):
         pass
 
     def update_dependents_post_init(self):
+        # the main view may also scroll itself while drawing, e.g. to keep
+        # the caret visible
+        self.scroll_sync.set_drawn_position(*self.get_scroll_position())
         self.top.UpdateView()
         self.left.UpdateView()
+        self.overview.Refresh()
+
+    def set_table(self, table):
+        self.main.set_table(table)
+        self.overview.set_table(table)
 
     def set_data(self, data, *args, **kwargs):
-        self.main.set_data(data, *args, **kwargs)
+        self.set_table(self.main.table.__class__(data, *args, **kwargs))
+
+    def compare_with(self, other):
+        """Highlight the bytes that differ between this view's table and
+        other, which is either a HexTable or another HexGridWindow (which
+        then shows the differences as well).
+        """
+        self.stop_compare()
+        views = [self.main]
+        grids = [self]
+        if isinstance(other, HexGridWindow):
+            other.stop_compare()
+            views.append(other.main)
+            grids.append(other)
+            other = other.main.table
+
+        def on_progress(index, last_index):
+            for view in views:
+                view.on_scan_progress(index, last_index)
+
+        engine = hexview.DiffEngine(self.main.table, other, on_progress)
+        for view in views:
+            view.diff_engine = engine
+        for grid in grids:
+            grid.compared_views = views
+        engine.start()
+
+    def stop_compare(self):
+        engine = self.main.diff_engine
+        if engine is not None:
+            engine.clear()
+        # the engine's style layer was removed from both tables, so every
+        # view of the comparison has to drop its highlighting
+        views = self.compared_views
+        for view in views:
+            view.diff_engine = None
+            view.invalidate_all()
+            view.UpdateView()
+        for grid in [v.GetParent() for v in views]:
+            grid.compared_views = []
 
 
 class MyApp(wx.App):
@@ -294,7 +741,10 @@ class MyApp(wx.App):
         splitter.SetMinimumPaneSize(20)
         table = hexview.VariableWidthHexTable(np.arange(1024, dtype=np.uint8), 4, 0x602, [1, 2, 3, 4])
         scroll1 = HexGridWindow(hexview.FixedFontMultiCellNumpyWindow, table, splitter)
-        table = hexview.HexTable(np.arange(1024, dtype=np.uint8), 16, 0x602)
+        if len(sys.argv) > 1:
+            table = hexview.HexTable.from_file(sys.argv[1], 16, 0)
+        else:
+            table = hexview.HexTable(np.arange(1024, dtype=np.uint8), 16, 0x602)
         scroll2 = HexGridWindow(hexview.FixedFontNumpyWindow, table, splitter)
 
         splitter.SplitVertically(scroll1, scroll2)
@@ -53,6 +53,11 @@ class MultiSash(wx.Window):
         self.live_update = True
         self.live_update_control = None
         self._defChild = EmptyChild
+        # every MultiClient in the tree, indexed so lookups don't have to
+        # walk the splits: uuid -> client, and the clients showing an empty
+        # child (a dict rather than a set so the oldest is reused first)
+        self.clients = {}
+        self.empty_clients = {}
         self.child = MultiSplit(self,self,(0,0),self.GetSize())
         self.Bind(wx.EVT_SIZE,self.OnMultiSize)
         self.Bind(wx.EVT_MOTION,self.OnMouseMove)
@@ -67,6 +72,8 @@ class MultiSash(wx.Window):
 
     def Clear(self):
         old = self.child
+        self.clients = {}
+        self.empty_clients = {}
         self.child = MultiSplit(self,self,(0,0),self.GetSize())
         old.Destroy()
         self.child.OnSize(None)
@@ -87,13 +94,17 @@ class MultiSash(wx.Window):
             d = json.loads(d)
             layout = d['child']
         old = self.child
+        old_clients = self.clients, self.empty_clients
+        self.clients = {}
+        self.empty_clients = {}
         self.child = MultiSplit(self,self,wx.Point(0,0),self.GetSize())
         try:
             self.child.restore_layout(layout)
         except KeyError as e:
-            log.error("Error loading layout: missing key %s. Restoring previous layout." % e.message)
+            log.error("Error loading layout: missing key %s. Restoring previous layout." % e)
             self.child.Destroy()
             self.child = old
+            self.clients, self.empty_clients = old_clients
         else:
             old.Destroy()
         self.OnMultiSize(None)
@@ -102,11 +113,23 @@ class MultiSash(wx.Window):
     def update_captions(self):
         self.Refresh()
 
+    def register_client(self, client):
+        self.clients[client.child_uuid] = client
+        if isinstance(client.child, self._defChild):
+            self.empty_clients[client] = True
+        else:
+            self.empty_clients.pop(client, None)
+
+    def unregister_client(self, client):
+        if self.clients.get(client.child_uuid) is client:
+            del self.clients[client.child_uuid]
+        self.empty_clients.pop(client, None)
+
     def find_uuid(self, uuid):
-        return self.child.find_uuid(uuid)
+        return self.clients.get(uuid)
 
     def find_empty(self):
-        return self.child.find_empty()
+        return next(iter(self.empty_clients), None)
 
     def focus_uuid(self, uuid):
         found = self.find_uuid(uuid)
@@ -190,27 +213,11 @@ class MultiSplit(wx.Window):
 
         self.Bind(wx.EVT_SIZE,self.OnSize)
 
-    def find_uuid(self, uuid):
-        if self.view1:
-            found = self.view1.find_uuid(uuid)
-            if found is not None:
-                return found
-        if self.view2:
-            found = self.view2.find_uuid(uuid)
-            if found is not None:
-                return found
-        return None
-
-    def find_empty(self):
+    def unregister_clients(self):
         if self.view1:
-            found = self.view1.find_empty()
-            if found is not None:
-                return found
+            self.view1.unregister_clients()
         if self.view2:
-            found = self.view2.find_empty()
-            if found is not None:
-                return found
-        return None
+            self.view2.unregister_clients()
 
     def add(self, control=None, u=None, direction=MV_HOR):
         if control is None:
@@ -252,6 +259,7 @@ class MultiSplit(wx.Window):
                 self.view1 = MultiViewLeaf(self.multiView,self, (0,0),self.GetSize())
             self.view1.restore_layout(v1Data)
             if old:
+                old.unregister_clients()
                 old.Destroy()
         v2Data = d.get('view2',None)
         if v2Data:
@@ -263,6 +271,7 @@ class MultiSplit(wx.Window):
                 self.view2 = MultiViewLeaf(self.multiView,self, (0,0),self.GetSize())
             self.view2.restore_layout(v2Data)
             if old:
+                old.unregister_clients()
                 old.Destroy()
         self.set_sizes_from_ratio(w, h)
 
@@ -317,6 +326,7 @@ class MultiSplit(wx.Window):
     def DestroyLeaf(self,caller):
         if not self.view2:              # We will only have 2 windows if
             return                      # we need to destroy any
+        caller.unregister_clients()
         parent = self.GetParent()       # Another splitview
         if parent == self.multiView:    # We'r at the root
             if caller == self.view1:
@@ -448,19 +458,8 @@ class MultiViewLeaf(wx.Window):
 
         self.SetBackgroundColour(wx.SystemSettings.GetColour(wx.SYS_COLOUR_3DFACE))
 
-    def find_uuid(self, uuid):
-        if uuid == self.detail.child_uuid:
-            log.debug("find_uuid: found %s in %s" % (uuid, self.detail.child.GetName()))
-            return self.detail
-        log.debug("find_uuid: skipping %s in %s" % (self.detail.child_uuid, self.detail.child.GetName()))
-        return None
-
-    def find_empty(self):
-        if isinstance(self.detail.child, self.multiView._defChild):
-            log.debug("find_empty: found %s" % (self.detail.child.GetName()))
-            return self.detail
-        log.debug("find_empty: skipping %s in %s" % (self.detail.child_uuid, self.detail.child.GetName()))
-        return None
+    def unregister_clients(self):
+        self.multiView.unregister_client(self.detail)
 
     def get_layout(self):
         d = {}
@@ -482,6 +481,7 @@ class MultiViewLeaf(wx.Window):
                 attr = getattr(self.detail.child,'restore_layout')
                 if callable(attr):
                     attr(dData)
+        self.multiView.unregister_client(old)
         old.Destroy()
         self.detail.OnSize(None)
 
@@ -586,6 +586,7 @@ class MultiClient(wx.Window):
         self.child = child
         self.child.Reparent(self)
         self.move_child()
+        top.register_client(self)
         log.debug("Created client for %s" % self.child_uuid)
 
         self.Bind(wx.EVT_SET_FOCUS,self.OnSetFocus)
@@ -677,6 +678,8 @@ class MultiClient(wx.Window):
             button.SetSize(x, y, w, h)
 
     def replace(self, child, u=None):
+        top = self.GetParent().multiView
+        top.unregister_client(self)
         if self.child:
             self.child.Destroy()
             self.child = None
@@ -686,6 +689,7 @@ class MultiClient(wx.Window):
             u = str(uuid4())
         self.child_uuid = u
         self.move_child()
+        top.register_client(self)
 
     def move_child(self):
         if self.use_title_bar:
@@ -0,0 +1,109 @@
+import time
+
+import wx
+
+
+class ScrollSync(object):
+    """Keeps any number of panes aligned to one shared viewport and
+    coalesces their repaints to at most one per frame.
+
+    Panes register with an axis mask (use_x, use_y): a column header
+    follows only the horizontal position, a row header only the vertical
+    one, a data pane or a linked split view of the same document follows
+    both. Scroll requests from any source only record the new viewport
+    origin, and repaint requests (data, selection or zoom changes) only
+    record their reason; a one-shot timer then notifies each pane at most
+    once per frame, no matter how many requests came in, by calling
+
+        pane.on_viewport_changed(x, y, dx, dy)
+
+    with the origin and the delta since the previous notification, both
+    masked to the pane's axes. After a scroll alone, panes whose axes
+    didn't move are skipped; a repaint request notifies every pane,
+    whatever its reason.
+    """
+    def __init__(self, interval=16):
+        self.interval = interval  # milliseconds
+        self.panes = []
+        self.x = self.y = 0
+        self.notified_x = self.notified_y = 0
+        self.reasons = set()
+        self.repaint = False
+        self.pending = None
+        self.last_flush_time = 0
+        self.num_requests = 0
+        self.num_merged = 0
+        self.num_flushes = 0
+        self.num_notifications = 0
+
+    def register(self, pane, use_x=1, use_y=1):
+        self.unregister(pane)
+        self.panes.append((pane, use_x, use_y))
+
+    def unregister(self, pane):
+        self.panes = [p for p in self.panes if p[0] is not pane]
+
+    @property
+    def view_start(self):
+        return self.x, self.y
+
+    def scroll_to(self, x, y):
+        self.x, self.y = x, y
+        self.schedule("scroll")
+
+    def scroll_by(self, dx, dy):
+        self.scroll_to(self.x + dx, self.y + dy)
+
+    def set_drawn_position(self, x, y):
+        """Record a viewport the panes have already been drawn at, e.g.
+        by a synchronous repaint, so that a pending scroll to it is skipped
+        """
+        self.x, self.y = x, y
+        self.notified_x, self.notified_y = x, y
+
+    def request(self, reason):
+        """Repaint every pane on the next frame even if the viewport
+        didn't move
+        """
+        self.repaint = True
+        self.schedule(reason)
+
+    def schedule(self, reason):
+        self.num_requests += 1
+        if self.reasons:
+            self.num_merged += 1
+        self.reasons.add(reason)
+        if self.pending is None:
+            elapsed = (time.time() - self.last_flush_time) * 1000
+            delay = max(1, int(self.interval - elapsed))
+            self.pending = wx.CallLater(delay, self.flush)
+
+    def flush(self):
+        """Notify the panes now instead of waiting for the next frame"""
+        if self.pending is not None:
+            self.pending.Stop()
+            self.pending = None
+        if not self.reasons:
+            return
+        repaint = self.repaint
+        self.reasons = set()
+        self.repaint = False
+        dx = self.x - self.notified_x
+        dy = self.y - self.notified_y
+        if dx == 0 and dy == 0 and not repaint:
+            return
+        self.notified_x, self.notified_y = self.x, self.y
+        self.last_flush_time = time.time()
+        self.num_flushes += 1
+        for pane, use_x, use_y in list(self.panes):
+            if repaint or (dx and use_x) or (dy and use_y):
+                self.num_notifications += 1
+                pane.on_viewport_changed(self.x * use_x, self.y * use_y, dx * use_x, dy * use_y)
+
+    def get_stats(self):
+        return {
+            "requests": self.num_requests,
+            "merged": self.num_merged,
+            "flushes": self.num_flushes,
+            "notifications": self.num_notifications,
+        }
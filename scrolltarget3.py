@@ -1,8 +1,12 @@
 import time
 import sys
+from collections import OrderedDict
 
+import numpy as np
 import wx
 
+from scrollsync import ScrollSync
+
 
 def ForceBetween(min, val, max):
     if val  > max:
@@ -13,6 +17,8 @@ def ForceBetween(min, val, max):
 
 class HexGridWindow(wx.ScrolledWindow):
     def __init__(self, parent, line_renderer, num_lines, *args, **kwargs):
+        # pass the scroll_sync of another HexGridWindow to link the views
+        scroll_sync = kwargs.pop("scroll_sync", None)
         wx.ScrolledWindow.__init__ (self, parent, -1, *args, **kwargs)
         self.SetAutoLayout(True)
 
@@ -31,10 +37,27 @@ class HexGridWindow(wx.ScrolledWindow):
         sizer.AddGrowableRow(1)
         self.SetSizer(sizer)
         self.SetTargetWindow(self.main)
+        # the panes shift their own backing stores, so wx only has to
+        # invalidate the data pane rather than scroll its pixels
+        self.EnableScrolling(False, False)
         self.set_pane_sizes(self.line_renderer.virtual_width, self.num_lines * self.line_renderer.h, 80, 20)
         line_renderer.set_scroll_rate(self)
+
+        if scroll_sync is None:
+            scroll_sync = ScrollSync()
+        self.scroll_sync = scroll_sync
+        for pane in [self.top, self.left, self.main]:
+            scroll_sync.register(pane, pane.use_x, pane.use_y)
+        scroll_sync.register(self)
         self.Bind(wx.EVT_SCROLLWIN, self.on_scroll_window)
         self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+    def on_destroy(self, event):
+        if event.GetEventObject() is self:
+            for pane in [self.top, self.left, self.main, self]:
+                self.scroll_sync.unregister(pane)
+        event.Skip()
 
     def on_size(self, event ):
         print("Size " + str(self.GetSize()))
@@ -59,31 +82,156 @@ class HexGridWindow(wx.ScrolledWindow):
        
     def on_scroll_window(self, event):
         """
-        OnScrollWindow Event Callback. This should let the main panel scroll in
-        both direction but transmit the vertical scrolling to the left panel
-        and the horizontal scrolling to the top window
+        OnScrollWindow Event Callback. Scrolling in either direction only
+        moves the shared viewport; the scroll sync then notifies every
+        pane (and any linked view) once per frame.
         """
-        sx,sy = self.GetScrollPixelsPerUnit()
+        x, y = self.scroll_sync.view_start
         if event.GetOrientation() == wx.HORIZONTAL:
-            dx = event.GetPosition()
-            dy = self.GetScrollPos(wx.VERTICAL)
+            x = self.calc_scroll_pos(event, x, self.main.fully_visible_cells, self.line_renderer.num_cells)
         else:
-            dx = self.GetScrollPos(wx.HORIZONTAL)
-            dy = event.GetPosition()
-       
-        pos = (dx ,dy)
-        print("scrolling..." + str(pos) + str(event.GetPosition()))
-        # self.main.Scroll(dx, dy)
-        # self.top.Scroll(dx, 0)
-        # self.left.Scroll(0, dy)
-        event.Skip()
+            y = self.calc_scroll_pos(event, y, self.main.fully_visible_rows, self.num_lines)
+        self.scroll_sync.scroll_to(x, y)
+
+    def calc_scroll_pos(self, event, pos, page, total):
+        event_type = event.GetEventType()
+        if event_type == wx.wxEVT_SCROLLWIN_LINEUP:
+            pos -= 1
+        elif event_type == wx.wxEVT_SCROLLWIN_LINEDOWN:
+            pos += 1
+        elif event_type == wx.wxEVT_SCROLLWIN_PAGEUP:
+            pos -= page
+        elif event_type == wx.wxEVT_SCROLLWIN_PAGEDOWN:
+            pos += page
+        elif event_type == wx.wxEVT_SCROLLWIN_TOP:
+            pos = 0
+        elif event_type == wx.wxEVT_SCROLLWIN_BOTTOM:
+            pos = total
+        else:
+            pos = event.GetPosition()
+        return ForceBetween(0, pos, max(0, total - page))
+
+    def on_viewport_changed(self, x, y, dx, dy):
+        # moves the scrollbar thumbs; the panes have already been told
+        self.Scroll(x, y)
 
     def move_viewport(self, row, col):
-        # self.main.SetScrollPos(wx.HORIZONTAL, col)
-        # self.main.SetScrollPos(wx.VERTICAL, row)
-        self.Scroll(col, row)
         print(("viewport: %d,%d" % (row, col)))
-        self.main.Refresh()
+        self.scroll_sync.scroll_to(col, row)
+
+    def paint_all(self):
+        self.line_renderer.invalidate()
+        for pane in [self.top, self.left, self.main]:
+            pane.invalidate_all()
+            pane.Refresh()
+
+
+class CaretIndex(object):
+    """Set of carets (row, col) kept sorted by row, then column, in a pair
+    of numpy arrays.
+
+    Finding the carets in a range of rows is two binary searches, so
+    painting only costs the number of visible carets no matter how many
+    exist; bulk operations (a caret on every match, a column of carets
+    down thousands of lines, moving all carets at once) are vectorized.
+    """
+    def __init__(self, rows=None, cols=None):
+        self.clear()
+        if rows is not None:
+            self.add_many(rows, cols)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return zip(self.rows.tolist(), self.cols.tolist())
+
+    def clear(self):
+        self.rows = np.zeros(0, dtype=np.intp)
+        self.cols = np.zeros(0, dtype=np.intp)
+
+    def set_carets(self, rows, cols):
+        self.clear()
+        self.add_many(rows, cols)
+
+    def add(self, row, col):
+        self.add_many([row], [col])
+
+    def add_many(self, rows, cols):
+        rows = np.append(self.rows, np.asarray(rows, dtype=np.intp))
+        cols = np.append(self.cols, np.asarray(cols, dtype=np.intp))
+        self.rows, self.cols = self.sort_unique(rows, cols)
+
+    def add_column(self, first_row, last_row, col):
+        """Add a caret at col in every row from first_row to last_row"""
+        rows = np.arange(first_row, last_row + 1, dtype=np.intp)
+        self.add_many(rows, np.full(len(rows), col, dtype=np.intp))
+
+    def remove(self, row, col):
+        keep = (self.rows != row) | (self.cols != col)
+        self.rows = self.rows[keep]
+        self.cols = self.cols[keep]
+
+    def move(self, num_rows, num_cols, max_row, max_col):
+        """Move every caret by the given number of rows and columns,
+        clamped to the grid; carets that end up in the same place merge.
+        """
+        rows = np.clip(self.rows + num_rows, 0, max_row)
+        cols = np.clip(self.cols + num_cols, 0, max_col)
+        self.rows, self.cols = self.sort_unique(rows, cols)
+
+    @staticmethod
+    def sort_unique(rows, cols):
+        if len(rows) == 0:
+            return rows, cols
+        order = np.lexsort((cols, rows))
+        rows = rows[order]
+        cols = cols[order]
+        keep = np.empty(len(rows), dtype=bool)
+        keep[0] = True
+        keep[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        return rows[keep], cols[keep]
+
+    def query(self, first_row, last_row):
+        """Return the (rows, cols) arrays of the carets in rows first_row
+        up to (but not including) last_row.
+        """
+        lo = np.searchsorted(self.rows, first_row, side="left")
+        hi = np.searchsorted(self.rows, last_row, side="left")
+        return self.rows[lo:hi], self.cols[lo:hi]
+
+
+class LineSource(object):
+    """Virtual source of the lines shown in a HexGridWindow.
+
+    Only the cells that are going to be drawn are ever requested, so a
+    source can be backed by something much larger than memory (e.g. a log
+    file indexed by line offsets) and the cost of a paint depends only on
+    the size of the viewport.
+    """
+    def __init__(self, num_lines, num_cells):
+        self.num_lines = num_lines
+        self.num_cells = num_cells
+
+    def get_cells(self, line_num, start_cell, count):
+        """Return the text of at most count cells of the line starting at
+        start_cell; shorter (or empty) if the line ends first.
+        """
+        raise NotImplementedError("implement get_cells() in subclass!")
+
+
+class DemoLineSource(LineSource):
+    stuff = ",".join([str(i) for i in range(50)])
+
+    def get_cells(self, line_num, start_cell, count):
+        # only the short per-line prefix is formatted; the rest is sliced
+        # from the shared constant
+        prefix = "line #%d with lots of extra stuff: " % line_num
+        if start_cell < len(prefix):
+            text = prefix[start_cell:start_cell + count]
+            return text + self.stuff[0:count - len(text)]
+        start = start_cell - len(prefix)
+        return self.stuff[start:start + count]
 
 
 class Line(object):
@@ -105,32 +253,71 @@ class Line(object):
     def set_scroll_rate(self, parent):
         parent.SetScrollRate(self.w, self.h)
 
-    def draw(self, dc, line_num, start_cell, num_cells):
+    def invalidate(self, line_num=None):
+        pass
+
+    def draw(self, dc, line_num, start_cell, num_cells, zoom=1):
         raise NotImplementedError("implement draw() in subclass!")
 
 
 class TextLine(Line):
-    def __init__(self, font, num_cells):
+    """Draws the lines of a LineSource, keeping the rendered visible part
+    of recently drawn lines as bitmaps so repaints of unchanged lines are
+    a single blit.
+    """
+    max_cached_lines = 1000
+
+    def __init__(self, font, source):
         self.font = font
+        self.source = source
         dc = wx.MemoryDC()
         dc.SetFont(font)
-        Line.__init__(self, dc.GetCharWidth(), dc.GetCharHeight(), num_cells)
-
-    def draw(self, dc, line_num, start_cell, num_cells):
-        """
-        """
-        dc.SetFont(self.font)
-        x = start_cell * self.w
-        y = line_num * self.h
-        w = self.vw
-        h = self.h
-        dc.SetBrush(wx.WHITE_BRUSH)
-        dc.SetPen(wx.WHITE_PEN)
-        dc.DrawRectangle(x, y, w, h)
-        text = "line #%d at %d,%d with lots of extra stuff: %s" % (line_num, x, y, ",".join([str(i) for i in range(50)])) 
-        part = text[start_cell:start_cell + num_cells]
-        #print("%d,%d: %s" % (x, y, part))
-        dc.DrawText(part, x, y)
+        Line.__init__(self, dc.GetCharWidth(), dc.GetCharHeight(), source.num_cells)
+        self.render_cache = OrderedDict()
+        self.zoom_fonts = {1: font}
+
+    def invalidate(self, line_num=None):
+        """Throw away the cached rendering of one line, or of all lines"""
+        if line_num is None:
+            self.render_cache = OrderedDict()
+        else:
+            for k in [k for k in self.render_cache if k[0] == line_num]:
+                del self.render_cache[k]
+
+    def get_font(self, zoom):
+        try:
+            return self.zoom_fonts[zoom]
+        except KeyError:
+            font = wx.Font(self.font)
+            font.SetPointSize(int(self.font.GetPointSize() * zoom))
+            self.zoom_fonts[zoom] = font
+            return font
+
+    def render(self, line_num, start_cell, num_cells, zoom):
+        w = self.w * zoom
+        h = self.h * zoom
+        bmp = wx.Bitmap(max(1, num_cells * w), h)
+        dc = wx.MemoryDC(bmp)
+        dc.SetBackground(wx.WHITE_BRUSH)
+        dc.Clear()
+        dc.SetFont(self.get_font(zoom))
+        dc.DrawText(self.source.get_cells(line_num, start_cell, num_cells), 0, 0)
+        del dc
+        return bmp
+
+    def draw(self, dc, line_num, start_cell, num_cells, zoom=1):
+        k = (line_num, start_cell, zoom)
+        try:
+            cached_cells, bmp = self.render_cache[k]
+            if cached_cells < num_cells:
+                raise KeyError(k)
+            self.render_cache.move_to_end(k)
+        except KeyError:
+            bmp = self.render(line_num, start_cell, num_cells, zoom)
+            self.render_cache[k] = (num_cells, bmp)
+            while len(self.render_cache) > self.max_cached_lines:
+                self.render_cache.popitem(last=False)
+        dc.DrawBitmap(bmp, start_cell * self.w * zoom, line_num * self.h * zoom)
 
 
 
@@ -149,7 +336,14 @@ class HexGridHeader(wx.ScrolledCanvas):
         self.next_scroll_time = 0
         self.scroll_timer = wx.Timer(self)
         self.scroll_delay = 1000  # milliseconds
-        self.carets = []
+        self.carets = CaretIndex()
+        self.first_visible_cell = self.first_visible_row = 0
+        self.backing_store = None
+        self.scroll_buffer = None
+        self.drawn_state = None
+        self.full_redraw = True
+        self.dirty_rows = set()
+        self.exposed_cells = None
         self.Bind(wx.EVT_LEFT_DOWN, self.on_left_down)
         self.Bind(wx.EVT_MOTION, self.on_motion)
         self.Bind(wx.EVT_LEFT_UP, self.on_left_up)
@@ -203,32 +397,135 @@ class HexGridHeader(wx.ScrolledCanvas):
         w, h = self.GetClientSize().Get()
         self.cell_pixel_height = self.parent.line_renderer.h * self.zoom
         self.cell_pixel_width = self.parent.line_renderer.w * self.zoom
-        self.fully_visible_rows = int(h / self.cell_pixel_height)
-        self.fully_visible_cells = int(w / self.cell_pixel_width)
-        self.visible_rows = ((h + self.cell_pixel_height - 1) / self.cell_pixel_height)
-        self.visible_cells = ((w + self.cell_pixel_width - 1) / self.cell_pixel_width)
+        self.fully_visible_rows = int(h // self.cell_pixel_height)
+        self.fully_visible_cells = int(w // self.cell_pixel_width)
+        self.visible_rows = int((h + self.cell_pixel_height - 1) // self.cell_pixel_height)
+        self.visible_cells = int((w + self.cell_pixel_width - 1) // self.cell_pixel_width)
+
+    def invalidate_all(self):
+        self.full_redraw = True
+
+    def invalidate_rows(self, first_row, last_row):
+        self.dirty_rows.update(range(first_row, last_row + 1))
+
+    def invalidate_carets(self):
+        # the caret outline extends a few pixels into the neighboring rows
+        first = self.first_visible_row
+        rows, _ = self.carets.query(first - 1, first + self.visible_rows + 1)
+        for row in np.unique(rows).tolist():
+            self.invalidate_rows(row - 1, row + 1)
+
+    def on_viewport_changed(self, x, y, dx, dy):
+        self.scroll_backing_store(x, y, dx, dy)
+        self.Refresh()
+
+    def scroll_backing_store(self, x, y, dx, dy):
+        """Move the rendered viewport by dx cells and dy rows, leaving only
+        the cells and rows that came into view to be rendered.
+        """
+        if self.drawn_state is None or self.full_redraw or (dx == 0 and dy == 0):
+            return
+        cell, row, w, h, zoom = self.drawn_state
+        # the store must hold what the delta assumes, and enough of it has
+        # to survive to be worth shifting
+        if (cell + dx, row + dy) != (x, y) or self.exposed_cells is not None:
+            self.full_redraw = True
+            return
+        if abs(dx) >= self.visible_cells or abs(dy) >= self.visible_rows:
+            self.full_redraw = True
+            return
+        px = dx * self.cell_pixel_width
+        py = dy * self.cell_pixel_height
+        if self.scroll_buffer is None or self.scroll_buffer.GetSize() != (w, h):
+            self.scroll_buffer = wx.Bitmap(w, h)
+        src = wx.MemoryDC(self.backing_store)
+        dest = wx.MemoryDC(self.scroll_buffer)
+        dest.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dest.Clear()
+        dest.Blit(max(0, -px), max(0, -py), w - abs(px), h - abs(py), src, max(0, px), max(0, py))
+        del src, dest
+        self.backing_store, self.scroll_buffer = self.scroll_buffer, self.backing_store
+        self.drawn_state = (x, y, w, h, zoom)
+        if dy > 0:
+            self.invalidate_rows(y + self.visible_rows - dy - 1, y + self.visible_rows)
+        elif dy < 0:
+            self.invalidate_rows(y, y - dy)
+        if dx > 0:
+            self.exposed_cells = (x + self.visible_cells - dx - 1, dx + 1)
+        elif dx < 0:
+            self.exposed_cells = (x, -dx)
+
+    def update_backing_store(self):
+        """Bring the off-screen copy of the viewport up to date, rendering
+        everything if the viewport moved or changed size, otherwise only
+        the rows that have been invalidated.
+        """
+        w, h = self.GetClientSize().Get()
+        w, h = max(w, 1), max(h, 1)
+        if self.backing_store is None or self.backing_store.GetSize() != (w, h):
+            self.backing_store = wx.Bitmap(w, h)
+            self.full_redraw = True
+        state = (self.first_visible_cell, self.first_visible_row, w, h, self.zoom)
+        if state != self.drawn_state:
+            self.drawn_state = state
+            self.full_redraw = True
+        if not self.full_redraw and not self.dirty_rows and self.exposed_cells is None:
+            return
+
+        dc = wx.MemoryDC(self.backing_store)
+        px, py = self.parent.CalcUnscrolledPosition(0, 0)
+        dc.SetLogicalOrigin(px * self.use_x, py * self.use_y)
+        first = self.first_visible_row
+        last = min(first + self.visible_rows, self.parent.num_lines)
+        if self.full_redraw:
+            dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+            dc.Clear()
+            rows = list(range(first, last))
+        else:
+            rows = sorted([r for r in self.dirty_rows if first <= r < last])
+            if self.exposed_cells is not None:
+                self.draw_rows(dc, list(range(first, last)), *self.exposed_cells)
+        self.draw_rows(dc, rows)
+        self.full_redraw = False
+        self.dirty_rows = set()
+        self.exposed_cells = None
+
+    def draw_rows(self, dc, rows, first_cell=None, num_cells=None):
+        if not rows:
+            return
+        if first_cell is None:
+            first_cell = self.first_visible_cell
+            num_cells = self.visible_cells
+        line_renderer = self.parent.line_renderer
+        x = first_cell * self.cell_pixel_width
+        w = num_cells * self.cell_pixel_width
+        dc.SetBrush(wx.WHITE_BRUSH)
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        for line in rows:
+            dc.DrawRectangle(x, line * self.cell_pixel_height, w, self.cell_pixel_height)
+            line_renderer.draw(dc, line, first_cell, num_cells, self.zoom)
+
+        # carets in neighboring rows overlap the rows just drawn
+        caret_rows, caret_cols = self.carets.query(rows[0] - 1, rows[-1] + 2)
+        for r, c in zip(caret_rows.tolist(), caret_cols.tolist()):
+            self.DrawSimpleCaret(c, r, dc)
 
     def on_paint(self, event):
         dc = wx.PaintDC(self)
         self.first_visible_cell, self.first_visible_row = self.parent.GetViewStart()
         self.first_visible_cell *= self.use_x
         self.first_visible_row *= self.use_y
+        self.update_backing_store()
 
-        px, py = self.parent.CalcUnscrolledPosition(0, 0)
-        px *= self.use_x
-        py *= self.use_y
-        dc.SetLogicalOrigin(px, py)
-
-        #print("on_paint: %dx%d at %d,%d. origin=%d,%d" % (self.visible_cells, self.visible_rows, self.first_visible_cell, self.first_visible_row, px, py))
+        # exposes (e.g. a dialog dragged over the grid) only copy the
+        # update region from the backing store
+        src = wx.MemoryDC(self.backing_store)
+        it = wx.RegionIterator(self.GetUpdateRegion())
+        while it.HaveRects():
+            r = it.GetRect()
+            dc.Blit(r.x, r.y, r.width, r.height, src, r.x, r.y)
+            it.Next()
 
-        line_num = self.first_visible_row
-        for line in range(line_num, min(line_num + self.visible_rows, self.parent.num_lines)):
-            self.parent.line_renderer.draw(dc, line, self.first_visible_cell, self.visible_cells)
-
-        for caret in self.carets:
-            r, c = caret
-            self.DrawSimpleCaret(c, r, dc)
-     
     def can_scroll(self):
         self.set_scroll_timer()
         if time.time() >  self.next_scroll_time:
@@ -313,7 +610,7 @@ class HexGridHeader(wx.ScrolledCanvas):
     def handle_on_motion(self, evt, row, col):
         scroll_row = 0
         scroll_col = 0
-        sx, sy = self.GetViewStart()
+        sx, sy = self.parent.GetViewStart()
         if self.is_left_of_screen(sx, col):
             if self.can_scroll():
                 scroll_col = self.handle_left_of_screen(col)
@@ -331,7 +628,10 @@ class HexGridHeader(wx.ScrolledCanvas):
         row += scroll_row
         col += scroll_col
         self.ensure_visible(row, col)
-        self.carets = [self.clamp_row_col(row, col)]
+        caret_row, caret_col = self.clamp_row_col(row, col)
+        self.invalidate_carets()
+        self.carets.set_carets([caret_row], [caret_col])
+        self.invalidate_carets()
         self.parent.Refresh()
 
     def DrawSimpleCaret(self, cell_x, cell_y, dc = None, old=False):
@@ -389,10 +689,16 @@ class MyApp(wx.App):
         frame = wx.Frame(None, id, "Test Tri-pane frame" )
         font = self.NiceFontForPlatform()
 
-        self.scroll = HexGridWindow(frame, TextLine(font, 100), 500)
+        source = DemoLineSource(500, 100)
+        line_renderer = TextLine(font, source)
+        splitter = wx.SplitterWindow(frame, -1)
+        self.scroll = HexGridWindow(splitter, line_renderer, source.num_lines)
+        # second view of the same lines, scrolled along with the first
+        self.linked = HexGridWindow(splitter, line_renderer, source.num_lines, scroll_sync=self.scroll.scroll_sync)
+        splitter.SplitHorizontally(self.scroll, self.linked)
 
         sizer = wx.BoxSizer(wx.VERTICAL)
-        sizer.Add(self.scroll, 1, wx.EXPAND)
+        sizer.Add(splitter, 1, wx.EXPAND)
 
         btn = wx.Button(frame, -1, "Press to redraw")
         sizer.Add(btn, 0, wx.EXPAND)
@@ -410,6 +716,7 @@ class MyApp(wx.App):
 
     def do_redraw(self, evt):
         self.scroll.paint_all()
+        self.linked.paint_all()
 
     def NiceFontForPlatform(self):
         point_size = 10
@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+
+wx = pytest.importorskip("wx")
+
+import hexview
+
+
+class TestEditOverlay(object):
+    def setup_method(self):
+        self.source = np.arange(4096, dtype=np.uint32).astype(np.uint8)
+        self.overlay = hexview.EditOverlay(self.source)
+
+    def make_edits(self, count):
+        rng = random.Random(1234)
+        expected = self.source.copy()
+        for _ in range(count):
+            index = rng.randrange(len(self.source) - 16)
+            values = [rng.randrange(256) for _ in range(rng.randrange(1, 16))]
+            self.overlay.write(index, values)
+            expected[index:index + len(values)] = values
+        return expected
+
+    def test_edits(self):
+        expected = self.make_edits(500)
+        assert self.overlay.is_modified
+        assert np.array_equal(self.overlay[:], expected)
+
+    def test_undo_everything(self):
+        self.make_edits(500)
+        while self.overlay.can_undo:
+            self.overlay.undo()
+        assert not self.overlay.is_modified
+        assert self.overlay.edits == ([], [])
+        data = self.overlay[100:200]
+        assert np.shares_memory(data, self.source)
+        assert np.array_equal(data, self.source[100:200])
+
+    def test_redo_everything(self):
+        expected = self.make_edits(100)
+        while self.overlay.can_undo:
+            self.overlay.undo()
+        while self.overlay.can_redo:
+            self.overlay.redo()
+        assert np.array_equal(self.overlay[:], expected)
+
+    def test_write_source_bytes(self):
+        self.overlay.write(10, self.source[10:20])
+        assert not self.overlay.is_modified
+
+
+@pytest.fixture(scope="module")
+def app():
+    return wx.App(False)
+
+
+class GridTest(object):
+    def make_view(self, app, num_bytes):
+        import hexviewscroller
+
+        frame = wx.Frame(None, -1, "test", size=(1000, 600))
+        table = hexview.HexTable(np.zeros(num_bytes, dtype=np.uint8), 16, 0)
+        grid = hexviewscroller.HexGridWindow(hexview.FixedFontNumpyWindow, table, frame)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(grid, 1, wx.EXPAND)
+        frame.SetSizer(sizer)
+        frame.Show()
+        frame.Layout()
+        app.Yield(True)
+        self.frame = frame
+        return grid.main
+
+    def teardown_method(self):
+        self.frame.Destroy()
+
+
+class TestAutoScroll(GridTest):
+    def test_content_smaller_than_window(self, app):
+        # 4 rows of 16 cells, both narrower and shorter than the window
+        main = self.make_view(app, 64)
+        assert main.sw > main.table.num_cells
+        assert main.sh > main.table.num_rows
+        w, h = main.GetClientSize()
+        for _ in range(20):
+            main.autoscroll_by(1, 1, w + 100, h + 100)
+        assert (main.sx, main.sy) == (0, 0)
+
+    def test_stops_at_end_of_data(self, app):
+        main = self.make_view(app, 16 * 1000)
+        w, h = main.GetClientSize()
+        for _ in range(20):
+            main.autoscroll_by(0, 100, w // 2, h + 100)
+        assert main.sy == main.table.num_rows - main.sh
+        assert main.cy == main.table.num_rows - 1
+
+
+class TestZoom(GridTest):
+    def test_header_panes_follow_zoom(self, app):
+        main = self.make_view(app, 16 * 1000)
+        grid = main.parent_scrolled_window
+        for zoom in [main.zoom_out, main.zoom_in, main.zoom_in]:
+            zoom()
+            app.Yield(True)
+            params = grid.view_params
+            assert grid.top.GetSize()[1] == main.cell_height_in_pixels + params.col_label_border_width
+            assert grid.left.GetSize()[0] == params.label_char_width * main.fw + params.row_label_border_width
+            assert grid.label_font.GetPointSize() == main.font.GetPointSize()